@@ -1,6 +1,9 @@
 CREATE DATABASE wonderline;
 \c wonderline;
 
+/* trigram indexes for searching users by name */
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 /* User is reserved word in PostgreSQL*/
 CREATE TABLE _User (
     id TEXT,
@@ -19,6 +22,10 @@ CREATE TABLE _User (
 );
 CREATE INDEX index_create_time
 ON _User (create_time);
+CREATE INDEX index_nick_name_trgm
+ON _User USING GIN (nick_name gin_trgm_ops);
+CREATE INDEX index_unique_name_trgm
+ON _User USING GIN (unique_name gin_trgm_ops);
 
 /*
 A is following B -> from_id = id(A), to_id = id(B)
@@ -41,9 +48,35 @@ CREATE TABLE Followed (
     from_id TEXT NOT NULL,
     to_id TEXT NOT NULL,
     follow_time TIMESTAMP WITH TIME ZONE NOT NULL,
+    /* create_time of B, set by the trigger below, so that the followers of A are sorted without reading _User */
+    to_create_time TIMESTAMP WITH TIME ZONE NOT NULL,
     FOREIGN KEY (from_id) REFERENCES _User(id),
     FOREIGN KEY (to_id) REFERENCES _User(id),
     PRIMARY KEY(from_id, to_id)
 );
 CREATE INDEX index_to_id
-ON Followed (from_id);
\ No newline at end of file
+ON Followed (to_id);
+/* keyset pagination of the followers of a user, sorted by (to_create_time, to_id) */
+CREATE INDEX index_from_id_to_create_time_to_id
+ON Followed (from_id, to_create_time DESC, to_id DESC);
+
+/* the create_time of a user never changes, so it is copied once per follow */
+CREATE FUNCTION set_followed_to_create_time() RETURNS trigger AS $$
+BEGIN
+    SELECT create_time INTO NEW.to_create_time FROM _User WHERE id = NEW.to_id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER followed_to_create_time
+BEFORE INSERT OR UPDATE OF to_id ON Followed
+FOR EACH ROW EXECUTE PROCEDURE set_followed_to_create_time();
+/*
+ids of the signed out user tokens, kept until the tokens expire
+*/
+CREATE TABLE Revoked_Token (
+    jti TEXT NOT NULL,
+    expire_time TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (jti)
+);
+CREATE INDEX index_expire_time
+ON Revoked_Token (expire_time);
@@ -0,0 +1,62 @@
+"""
+Micro-benchmark of `wonderline_app.utils.edit_distance` against the former full-matrix implementation.
+
+Run from the repository root: python benchmarks/edit_distance.py
+"""
+import importlib.util
+import os
+import random
+import string
+import timeit
+
+# load the module by its path, importing the wonderline_app package would start the whole application
+_UTILS_PATH = os.path.join(os.path.dirname(__file__), '..', 'wonderline_app', 'utils.py')
+_spec = importlib.util.spec_from_file_location('wonderline_utils', _UTILS_PATH)
+utils = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(utils)
+
+
+def full_matrix_edit_distance(word1: str, word2: str) -> int:
+    """The implementation replaced by the bit-parallel one."""
+    l1, l2 = len(word1), len(word2)
+    dp = [[0] * (l2 + 1) for _ in range(l1 + 1)]
+    for i in range(l1 + 1):
+        dp[i][0] = i
+    for i in range(l2 + 1):
+        dp[0][i] = i
+    for i in range(1, l1 + 1):
+        for j in range(1, l2 + 1):
+            insert = 1 + dp[i][j - 1]
+            delete = 1 + dp[i - 1][j]
+            replace = 1 + dp[i - 1][j - 1]
+            if word1[i - 1] == word2[j - 1]:
+                replace -= 1
+            dp[i][j] = min(insert, delete, replace)
+    return dp[l1][l2]
+
+
+def _random_name(rand: random.Random) -> str:
+    return ''.join(rand.choice(string.ascii_lowercase + ' _') for _ in range(rand.randint(4, 24)))
+
+
+def main(candidate_nb: int = 2000, repeat: int = 5):
+    rand = random.Random(0)
+    candidates = [_random_name(rand) for _ in range(candidate_nb)]
+    query = 'jon snow'
+    expected = [full_matrix_edit_distance(query, candidate) for candidate in candidates]
+    assert utils.edit_distances(query, candidates) == expected
+
+    cases = {
+        'full matrix': lambda: [full_matrix_edit_distance(query, c) for c in candidates],
+        'bit-parallel': lambda: [utils.edit_distance(query, c) for c in candidates],
+        'bit-parallel, batch': lambda: utils.edit_distances(query, candidates),
+        'bit-parallel, batch, max_distance=3': lambda: utils.edit_distances(query, candidates, max_distance=3),
+    }
+    print(f"{candidate_nb} candidates, best of {repeat}")
+    for name, case in cases.items():
+        duration = min(timeit.repeat(case, number=1, repeat=repeat))
+        print(f"{name:<40}{duration * 1000:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
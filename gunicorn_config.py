@@ -1,5 +1,7 @@
+import os
+
 bind = "0.0.0.0:8000"
-workers = 1
+workers = int(os.environ.get("GUNICORN_WORKERS", 1))
 accesslog = "-"  # STDOUT
 access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"'
 loglevel = "debug"
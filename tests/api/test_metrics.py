@@ -0,0 +1,30 @@
+import pytest
+from flask import Flask
+from flask_restplus import Api
+
+from wonderline_app.api.metrics import resources
+from wonderline_app.api.namespaces import metrics_namespace
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(resources, 'get_pool_metrics', lambda: {"checkedOut": 1})
+    monkeypatch.setattr(resources, 'get_replica_pool_metrics', lambda: None)
+    app = Flask(__name__)
+    app.config['METRICS_TOKEN'] = 'metrics-secret'
+    api = Api(app)
+    api.add_namespace(metrics_namespace)
+    return app.test_client()
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Metrics-Token": "wrong"}])
+def test_metrics_require_the_metrics_token(client, headers):
+    response = client.get('/metrics', headers=headers)
+    assert response.status_code == 401
+    assert 'postgresPool' not in response.json
+
+
+def test_metrics_with_the_metrics_token(client):
+    response = client.get('/metrics', headers={"X-Metrics-Token": "metrics-secret"})
+    assert response.status_code == 200
+    assert response.json == {"postgresPool": {"checkedOut": 1}, "postgresReplicaPool": None}
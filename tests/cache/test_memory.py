@@ -0,0 +1,37 @@
+import time
+
+from wonderline_app.cache.memory import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" becomes the least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+
+
+def test_lru_cache_expires_entries():
+    cache = LRUCache(max_size=2, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a", default="missing") == "missing"
+    assert len(cache) == 0
+
+
+def test_lru_cache_stats():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    cache.delete("a")
+    assert cache.stats == {"backend": "LRUCache", "namespace": "default", "hits": 1, "misses": 1, "size": 0,
+                           "maxSize": 2}
+
+
+def test_lru_cache_disabled():
+    cache = LRUCache(max_size=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
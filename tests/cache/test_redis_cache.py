@@ -0,0 +1,64 @@
+import fnmatch
+
+from wonderline_app.cache.redis_cache import RedisCache
+
+
+class RedisStandIn:
+    """Stand-in for the few Redis commands used by RedisCache, TTL is ignored."""
+
+    def __init__(self):
+        self.data = {}
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, px=None):
+        self.data[key] = value.encode()
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match):
+        return [key for key in self.data if fnmatch.fnmatch(key, match)]
+
+    def pipeline(self, transaction=True):
+        return RedisPipelineStandIn(self)
+
+
+class RedisPipelineStandIn:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def set(self, *args, **kwargs):
+        self.commands.append((args, kwargs))
+
+    def execute(self):
+        for args, kwargs in self.commands:
+            self.client.set(*args, **kwargs)
+
+
+class UnreachableRedis:
+    def __getattr__(self, item):
+        raise ConnectionError("Redis is unreachable")
+
+
+def test_redis_cache_get_set_delete():
+    client = RedisStandIn()
+    cache = RedisCache(namespace="reduced_users", ttl=60, client=client)
+    cache.set_many({"user_001": {"nickName": "Jon Snow"}, "user_002": None})
+    assert set(client.data) == {"reduced_users:user_001", "reduced_users:user_002"}
+    assert cache.get_many(["user_001", "user_009"]) == {"user_001": {"nickName": "Jon Snow"}}
+    cache.delete("user_001")
+    assert cache.get("user_001") is None
+    cache.clear()
+    assert client.data == {}
+
+
+def test_redis_cache_degrades_to_misses_when_unreachable():
+    cache = RedisCache(namespace="reduced_users", client=UnreachableRedis())
+    cache.set("user_001", {"nickName": "Jon Snow"})
+    assert cache.get("user_001") is None
+    cache.delete("user_001")
+    cache.clear()
@@ -0,0 +1,45 @@
+import multiprocessing
+import time
+
+import pytest
+
+from wonderline_app.cache.shared_memory import SharedMemoryCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SharedMemoryCache(namespace="test", max_size=64, slot_size=128, directory=str(tmp_path))
+
+
+def _set_in_child_process(cache):
+    cache.set("user_001", {"nickName": "Jon Snow"})
+
+
+def test_shared_memory_cache_get_set_delete(cache):
+    cache.set_many({"user_001": {"nickName": "Jon Snow"}, "user_002": {"nickName": "Daenerys Targaryen"}})
+    assert cache.get_many(["user_001", "user_002", "user_009"]) == {
+        "user_001": {"nickName": "Jon Snow"},
+        "user_002": {"nickName": "Daenerys Targaryen"},
+    }
+    cache.delete("user_001")
+    assert cache.get("user_001") is None
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_shared_memory_cache_skips_values_larger_than_a_slot(cache):
+    cache.set("user_001", "x" * 128)
+    assert cache.get("user_001") is None
+
+
+def test_shared_memory_cache_expires_entries(tmp_path):
+    cache = SharedMemoryCache(namespace="test", max_size=64, ttl=0.01, directory=str(tmp_path))
+    cache.set("user_001", 1)
+    time.sleep(0.02)
+    assert cache.get("user_001") is None
+
+
+def test_shared_memory_cache_is_shared_between_processes(cache):
+    process = multiprocessing.get_context("fork").Process(target=_set_in_child_process, args=(cache,))
+    process.start()
+    process.join()
+    assert cache.get("user_001") == {"nickName": "Jon Snow"}
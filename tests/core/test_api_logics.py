@@ -350,9 +350,49 @@ class ApiTEST(unittest.TestCase):
         self._assert_response(
             expected_code=200,
             expected_res=expected_res,
-            response=response
+            response=response,
+            excludes=['timestamp', 'nextCursor']
+        )
+
+    def test_get_followers_with_cursor_expect_success(self):
+        first_page_response = self._get_req_from_jon(
+            endpoint='/users/user_001/followers',
+            params={
+                "userToken": 'test',
+                "sortType": "createTime",
+                "nb": 1
+            })
+        response = self._get_req_from_jon(
+            endpoint='/users/user_001/followers',
+            params={
+                "userToken": 'test',
+                "sortType": "createTime",
+                "nb": 2,
+                "cursor": first_page_response.json['nextCursor']
+            })
+
+        expected_res = {'payload': [
+            {'id': 'user_006', 'accessLevel': 'everyone', 'nickName': 'Cersei Lannister',
+             'uniqueName': 'cersei_lannister', 'avatarSrc': 'avatar.png'},
+            {'id': 'user_005', 'accessLevel': 'everyone', 'nickName': 'Samwell Tarly', "uniqueName": "samwell_tarly",
+             'avatarSrc': 'avatar.png'}],
+            'feedbacks': [], 'errors': [], 'timestamp': 1598128569991}
+        self._assert_response(
+            expected_code=200,
+            expected_res=expected_res,
+            response=response,
+            excludes=['timestamp', 'nextCursor']
         )
 
+    def test_get_followers_with_invalid_cursor(self):
+        response = self._get_req_from_jon(
+            endpoint='/users/user_001/followers',
+            params={
+                "userToken": 'test',
+                "cursor": "invalid"
+            })
+        self.assertEqual(400, response.status_code)
+
     def test_get_user_trips_expect_success(self):
         response = self._get_req_from_jon(
             endpoint='/users/user_001/trips',
@@ -436,7 +476,8 @@ class ApiTEST(unittest.TestCase):
         self._assert_response(
             expected_code=200,
             expected_res=expected_res,
-            response=response
+            response=response,
+            excludes=['timestamp', 'nextCursor']
         )
 
     # TODO: implement the test for get highlights
@@ -569,7 +610,8 @@ class ApiTEST(unittest.TestCase):
         self._assert_response(
             expected_code=200,
             expected_res=expected_res,
-            response=response
+            response=response,
+            excludes=['timestamp', 'nextCursor']
         )
 
     def test_get_mentions_expect_success(self):
@@ -645,7 +687,8 @@ class ApiTEST(unittest.TestCase):
         self._assert_response(
             expected_code=200,
             expected_res=expected_res,
-            response=response
+            response=response,
+            excludes=['timestamp', 'nextCursor']
         )
 
     def test_get_trip_expect_success(self):
@@ -866,9 +909,41 @@ class ApiTEST(unittest.TestCase):
         self._assert_response(
             expected_code=200,
             expected_res=expected_res,
-            response=response
+            response=response,
+            excludes=['timestamp', 'nextCursor']
         )
 
+    def test_get_trip_photos_with_cursor_expect_success(self):
+        params = {
+            "userToken": 'test',
+            "sortType": "createTime",
+            "nb": 2,
+            "accessLevel": "everyone"
+        }
+        first_page_response = self._get_req_from_jon(endpoint='/trips/trip_01/photos', params=params)
+        response = self._get_req_from_jon(
+            endpoint='/trips/trip_01/photos',
+            params={**params, "cursor": first_page_response.json['nextCursor']})
+        expected_response = self._get_req_from_jon(
+            endpoint='/trips/trip_01/photos',
+            params={**params, "startIndex": 2})
+
+        self._assert_response(
+            expected_code=200,
+            expected_res=expected_response.json,
+            response=response,
+            excludes=['timestamp', 'nextCursor']
+        )
+
+    def test_get_trip_photos_with_invalid_cursor(self):
+        response = self._get_req_from_jon(
+            endpoint='/trips/trip_01/photos',
+            params={
+                "userToken": 'test',
+                "cursor": "invalid"
+            })
+        self.assertEqual(400, response.status_code)
+
     def test_get_trip_photo_expect_success(self):
         response = self._get_req_from_jon(
             endpoint='/trips/trip_01/photos/photo_01_1',
@@ -1302,6 +1377,10 @@ class ApiTEST(unittest.TestCase):
                 expected_code=200,
                 expected_res={'errors': [], 'feedbacks': [], 'timestamp': 1601155452818}
             )
+            # the token is revoked
+            res = c.post("http://localhost:80/users/signOut", headers=default_headers,
+                         query_string=dict(userToken=jon_user_token))
+            assert res.status_code == 401
 
     def test_post_a_new_trip(self):
         response = self._post_req_from_jon(
@@ -2093,6 +2172,23 @@ class ApiTEST(unittest.TestCase):
             response=response,
             excludes=['timestamp']
         )
+        # the pagination runs over the users of the trip only
+        response = self._get_req_from_jon(
+            endpoint=f'/search/trip/{new_trip.trip_id}/users',
+            params={
+                "userToken": 'test',
+                "query": 'n',
+                "sortType": "bestMatch",
+                "startIndex": 1,
+                "nb": 1
+            })
+        expected_res["payload"] = expected_res["payload"][1:]
+        self._assert_response(
+            expected_code=200,
+            expected_res=expected_res,
+            response=response,
+            excludes=['timestamp']
+        )
         delete_all_about_given_trip(trip_id=new_trip.trip_id)
 
     def test_post_comment_reply(self):
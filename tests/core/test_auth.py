@@ -0,0 +1,177 @@
+import time
+
+import pytest
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+
+from wonderline_app.cache.memory import LRUCache
+from wonderline_app.core import auth
+from wonderline_app.core.auth import generate_auth_token, decode_auth_token, revoke_auth_token, \
+    decode_request_auth_token
+from wonderline_app.db.postgres.exceptions import UserTokenInvalid, UserTokenExpired
+
+
+class FakeRevokedTokenTable:
+    """Stands for the revoked_token table shared by every worker."""
+
+    def __init__(self):
+        self.revoked = {}
+        self.read_nb = 0
+
+    def is_revoked(self, jti: str) -> bool:
+        self.read_nb += 1
+        return jti in self.revoked
+
+    def revoke(self, jti: str, expire_time: float):
+        self.revoked[jti] = expire_time
+
+
+def _create_revoked_token_store(monkeypatch, table: FakeRevokedTokenTable) -> auth.RevokedTokenStore:
+    store = auth.RevokedTokenStore(
+        revoked_cache=LRUCache(namespace='revoked_tokens', max_size=100),
+        unrevoked_cache=LRUCache(namespace='unrevoked_tokens', max_size=100, ttl=5))
+    monkeypatch.setattr(store, '_is_revoked_in_db', table.is_revoked)
+    monkeypatch.setattr(store, '_revoke_in_db', table.revoke)
+    return store
+
+
+@pytest.fixture
+def revoked_token_table():
+    return FakeRevokedTokenTable()
+
+
+@pytest.fixture(autouse=True)
+def revoked_tokens(monkeypatch, revoked_token_table):
+    store = _create_revoked_token_store(monkeypatch, revoked_token_table)
+    monkeypatch.setattr(auth, 'REVOKED_TOKENS', store)
+    monkeypatch.setattr(auth, 'VERIFIED_TOKEN_CACHE', LRUCache(namespace='verified_tokens', max_size=100))
+    return store
+
+
+def _app_context(secret_key: str):
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = secret_key
+    return app.app_context()
+
+
+def test_token_is_valid_for_every_app_sharing_the_secret_key():
+    with _app_context('shared'):
+        token = generate_auth_token(user_id='user_001')
+    with _app_context('shared'):
+        assert decode_auth_token(token) == 'user_001'
+
+
+def test_token_signed_with_another_secret_key_is_invalid():
+    with _app_context('shared'):
+        token = generate_auth_token(user_id='user_001')
+    with _app_context('other'):
+        with pytest.raises(UserTokenInvalid):
+            decode_auth_token(token)
+
+
+def test_expired_token():
+    with _app_context('shared'):
+        token = generate_auth_token(user_id='user_001', expiration=-1)
+        with pytest.raises(UserTokenExpired):
+            decode_auth_token(token)
+
+
+def test_verified_token_is_cached(monkeypatch):
+    with _app_context('shared'):
+        token = generate_auth_token(user_id='user_001')
+        assert decode_auth_token(token) == 'user_001'
+        monkeypatch.setattr(auth, '_verify_auth_token', None)  # any verification would fail
+        assert decode_auth_token(token) == 'user_001'
+
+
+def test_cached_token_expires(monkeypatch):
+    with _app_context('shared'):
+        token = generate_auth_token(user_id='user_001', expiration=60)
+        assert decode_auth_token(token) == 'user_001'
+        now = time.time()
+        monkeypatch.setattr(auth.time, 'time', lambda: now + 120)
+        with pytest.raises(UserTokenExpired):
+            decode_auth_token(token)
+
+
+def test_revoked_token_is_invalid():
+    with _app_context('shared'):
+        token = generate_auth_token(user_id='user_001')
+        other_token = generate_auth_token(user_id='user_001')
+        assert decode_auth_token(token) == 'user_001'
+        revoke_auth_token(token)
+        with pytest.raises(UserTokenInvalid):
+            decode_auth_token(token)
+        assert decode_auth_token(other_token) == 'user_001'
+
+
+def test_revoked_token_is_invalid_for_every_worker(monkeypatch, revoked_token_table):
+    first_worker = (auth.VERIFIED_TOKEN_CACHE, auth.REVOKED_TOKENS)
+    second_worker = (LRUCache(namespace='verified_tokens', max_size=100),
+                     _create_revoked_token_store(monkeypatch, revoked_token_table))
+
+    def switch_to(worker):
+        monkeypatch.setattr(auth, 'VERIFIED_TOKEN_CACHE', worker[0])
+        monkeypatch.setattr(auth, 'REVOKED_TOKENS', worker[1])
+
+    with _app_context('shared'):
+        token = generate_auth_token(user_id='user_001')
+        # the token is verified and cached by both workers
+        assert decode_auth_token(token) == 'user_001'
+        switch_to(second_worker)
+        assert decode_auth_token(token) == 'user_001'
+        # signed out on the first worker
+        switch_to(first_worker)
+        revoke_auth_token(token)
+        # rejected by the second worker once it checks the table again, even though the token is still in its cache
+        # of verified tokens
+        switch_to(second_worker)
+        assert second_worker[0].get(auth._get_token_digest(token)) is not None
+        now = time.monotonic()
+        monkeypatch.setattr(time, 'monotonic', lambda: now + 10)
+        with pytest.raises(UserTokenInvalid):
+            decode_auth_token(token)
+
+
+def test_repeated_verification_does_not_read_the_revoked_tokens(revoked_token_table):
+    with _app_context('shared'):
+        token = generate_auth_token(user_id='user_001')
+        for _ in range(3):
+            assert decode_auth_token(token) == 'user_001'
+        assert revoked_token_table.read_nb == 1
+        revoke_auth_token(token)
+        for _ in range(3):
+            with pytest.raises(UserTokenInvalid):
+                decode_auth_token(token)
+        assert revoked_token_table.read_nb == 1
+
+
+def test_token_is_invalid_when_the_revoked_tokens_cannot_be_read(monkeypatch, revoked_tokens):
+    def fail(jti: str):
+        raise OperationalError("SELECT", {}, Exception("connection refused"))
+
+    monkeypatch.setattr(revoked_tokens, '_is_revoked_in_db', fail)
+    monkeypatch.setattr(auth.db_session, 'rollback', lambda: None)
+    with _app_context('shared'):
+        token = generate_auth_token(user_id='user_001')
+        with pytest.raises(UserTokenInvalid):
+            decode_auth_token(token)
+
+
+def test_request_token_is_decoded_once(monkeypatch):
+    decoded_tokens = []
+
+    def decode(token: str) -> str:
+        decoded_tokens.append(token)
+        raise UserTokenExpired
+
+    with _app_context('shared'):
+        token = generate_auth_token(user_id='user_001')
+        assert decode_request_auth_token(token) == 'user_001'
+        monkeypatch.setattr(auth, 'decode_auth_token', decode)
+        assert decode_request_auth_token(token) == 'user_001'
+        assert not decoded_tokens
+        for _ in range(2):
+            with pytest.raises(UserTokenExpired):
+                decode_request_auth_token('other_token')
+        assert decoded_tokens == ['other_token']
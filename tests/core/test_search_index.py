@@ -0,0 +1,78 @@
+from wonderline_app.core.search_index import UserSearchIndex
+
+
+def _reduced_user(user_id, nick_name, unique_name):
+    return {"id": user_id, "nickName": nick_name, "accessLevel": "everyone", "avatarSrc": "avatar",
+            "uniqueName": unique_name}
+
+
+def _build_index():
+    index = UserSearchIndex()
+    index.build([
+        _reduced_user("user_001", "Jon Snow", "jon_snow"),
+        _reduced_user("user_002", "Sansa Stark", "lady_sansa"),
+        _reduced_user("user_003", "Red Dragon", "red_dragon"),
+        _reduced_user("user_004", "Arya Stark", "no_one"),
+    ])
+    return index
+
+
+def test_search_ranks_word_prefix_matches_first():
+    index = _build_index()
+    assert [u["id"] for u in index.search("sn")] == ["user_001"]
+    assert [u["id"] for u in index.search("Sta")] == ["user_004", "user_002"]
+    assert [u["id"] for u in index.search("dragon", start_index=0, nb=1)] == ["user_003"]
+    assert [u["id"] for u in index.search("ar", start_index=1, nb=2)] == ["user_002"]
+
+
+def test_one_letter_queries_are_not_served():
+    index = _build_index()
+    assert not index.can_search("s")
+    assert index.can_search("st")
+    assert index.search("s") == []
+
+
+def test_short_query_candidates_are_capped(monkeypatch):
+    index = UserSearchIndex()
+    index.build([_reduced_user(f"user_{i:03}", f"Stark {i}", f"stark_{i}") for i in range(50)])
+    monkeypatch.setattr(UserSearchIndex, 'SHORT_QUERY_CANDIDATE_NB', 10)
+    assert len(index._get_candidates("st")) == 10
+    assert len(index.search("st", nb=20)) == 10
+    # the cap doesn't apply to the users of a trip
+    assert len(index.search("st", nb=20, user_ids=[f"user_{i:03}" for i in range(15)])) == 15
+
+
+def test_updates_during_build_are_kept():
+    index = _build_index()
+
+    def reduced_users():
+        yield _reduced_user("user_001", "Jon Snow", "jon_snow")
+        # received while the users are read for the new index
+        index.add(_reduced_user("user_005", "Bran Stark", "three_eyed_raven"))
+        index.remove("user_001")
+        yield _reduced_user("user_002", "Sansa Stark", "lady_sansa")
+
+    index.build(reduced_users())
+    assert [u["id"] for u in index.search("bran")] == ["user_005"]
+    assert index.search("snow") == []
+
+
+def test_search_fuzzy_matches():
+    index = _build_index()
+    # no name contains "sanza", but "sansa stark" shares the trigram "san"
+    assert [u["id"] for u in index.search("sanza")] == ["user_002"]
+    assert index.search("zzzz") == []
+
+
+def test_search_restricted_to_user_ids():
+    index = _build_index()
+    assert [u["id"] for u in index.search("stark", user_ids=["user_004"])] == ["user_004"]
+
+
+def test_search_index_incremental_updates():
+    index = _build_index()
+    index.add(_reduced_user("user_004", "Faceless", "no_one"))
+    assert [u["id"] for u in index.search("stark")] == ["user_002"]
+    assert index.search("faceless")[0]["nickName"] == "Faceless"
+    index.remove("user_004")
+    assert index.search("no_one") == []
@@ -0,0 +1,47 @@
+import pytest
+from cassandra.cqlengine import models
+
+from wonderline_app.db.cassandra import counters
+from wonderline_app.db.cassandra.counters import PhotoCounters, ReplyCounters, get_counter, \
+    get_increment_counter_cql, increment_counter
+
+
+@pytest.fixture(autouse=True)
+def keyspace(monkeypatch):
+    monkeypatch.setattr(models, 'DEFAULT_KEYSPACE', 'test')
+
+
+def test_get_increment_counter_cql():
+    assert get_increment_counter_cql(PhotoCounters, 'liked_nb') == \
+        'UPDATE test.photo_counters SET "liked_nb" = "liked_nb" + ? WHERE "photo_id" = ?'
+    assert get_increment_counter_cql(ReplyCounters, 'liked_nb') == \
+        'UPDATE test.reply_counters SET "liked_nb" = "liked_nb" + ? WHERE "comment_id" = ? AND "reply_id" = ?'
+
+
+def test_get_counter(monkeypatch):
+    monkeypatch.setattr(counters, 'get_models_by_primary_keys', lambda cls, keys: [
+        PhotoCounters(photo_id='photo_01', liked_nb=3) if key == ('photo_01',) else None for key in keys])
+    assert get_counter(PhotoCounters, 'liked_nb', 'photo_01') == 3
+    # counters which have never been incremented
+    assert get_counter(PhotoCounters, 'comment_nb', 'photo_01') == 0
+    assert get_counter(PhotoCounters, 'liked_nb', 'photo_02') == 0
+
+
+def test_increment_counter(monkeypatch):
+    executions = []
+    monkeypatch.setattr(counters.PREPARED_STATEMENTS, 'execute', lambda cql, parameters: executions.append(parameters))
+    increment_counter(ReplyCounters, 'liked_nb', 'comment_01', 'reply_01', delta=-1)
+    assert executions == [[-1, 'comment_01', 'reply_01']]
+
+
+def test_delete_counters(monkeypatch):
+    executions = []
+    monkeypatch.setattr(counters.PREPARED_STATEMENTS, 'execute', lambda cql, parameters: executions.append(
+        (cql, parameters)))
+    counters.delete_counters(ReplyCounters, 'comment_01', 'reply_01')
+    # every reply counter of the comment
+    counters.delete_counters(ReplyCounters, 'comment_01')
+    assert executions == [
+        ('DELETE FROM test.reply_counters WHERE "comment_id" = ? AND "reply_id" = ?', ['comment_01', 'reply_01']),
+        ('DELETE FROM test.reply_counters WHERE "comment_id" = ?', ['comment_01']),
+    ]
@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import pytest
+from cassandra.cqlengine import models, query
+
+from wonderline_app.db.cassandra.models import LikesByPhoto, Photo, Trip, write_trip_memberships
+from wonderline_app.db.cassandra.statements import PREPARED_STATEMENTS
+from wonderline_app.db.postgres.models import User
+
+
+@pytest.fixture(autouse=True)
+def keyspace(monkeypatch):
+    monkeypatch.setattr(models, 'DEFAULT_KEYSPACE', 'test')
+
+
+def test_liked_users_preview_is_bounded(monkeypatch):
+    executions = []
+
+    def execute(cql, parameters):
+        executions.append((cql, parameters))
+        return [{'photo_id': 'photo_01', 'user_id': 'user_001', 'create_time': None}]
+
+    monkeypatch.setattr(PREPARED_STATEMENTS, 'execute', execute)
+    assert LikesByPhoto.get_user_ids(photo_id='photo_01', nb=2) == ['user_001']
+    assert executions == [(
+        'SELECT "photo_id", "user_id", "create_time" FROM test.likes_by_photo WHERE "photo_id" = ? LIMIT ?',
+        ['photo_01', 2])]
+
+
+class FakeLWTResult:
+    def __init__(self, was_applied: bool):
+        self.was_applied = was_applied
+
+    def one(self):
+        return {'[applied]': self.was_applied}
+
+
+def test_repeated_like_or_unlike_is_not_applied(monkeypatch):
+    likes = set()
+    statements = []
+
+    def execute_statement(model, statement, consistency_level, timeout, connection=None):
+        statements.append(str(statement))
+        like = tuple(statement.get_context().values())[:2]
+        if getattr(statement, 'if_not_exists', False):
+            was_applied = like not in likes
+            likes.add(like)
+        else:
+            was_applied = like in likes
+            likes.discard(like)
+        return FakeLWTResult(was_applied)
+
+    monkeypatch.setattr(query, '_execute_statement', execute_statement)
+    # liked_nb is only incremented or decremented when the like or the unlike is applied
+    assert LikesByPhoto.like(photo_id='photo_01', user_id='user_001')
+    assert not LikesByPhoto.like(photo_id='photo_01', user_id='user_001')
+    assert LikesByPhoto.unlike(photo_id='photo_01', user_id='user_001')
+    assert not LikesByPhoto.unlike(photo_id='photo_01', user_id='user_001')
+    assert [statement.endswith('IF NOT EXISTS') for statement in statements] == [True, True, False, False]
+    assert all(statement.endswith('IF EXISTS') for statement in statements[2:])
+
+
+def test_liked_users_preview_keeps_the_order_of_the_likes(monkeypatch):
+    monkeypatch.setattr(LikesByPhoto, 'get_user_ids', lambda photo_id, nb: ['user_001', 'user_002', 'user_003'])
+    monkeypatch.setattr(User, 'get_users_by_ids', lambda user_ids, start_index, user_nb: [
+        {'id': 'user_003'}, {'id': 'user_001'}])
+    assert Photo(photo_id='photo_01').get_liked_users_info(nb=3) == [{'id': 'user_001'}, {'id': 'user_003'}]
+
+
+def test_write_trip_memberships_without_reads(monkeypatch):
+    executions = []
+    monkeypatch.setattr(PREPARED_STATEMENTS, 'execute_concurrent_statements', executions.extend)
+    trip = Trip(trip_id='trip_01', owner_id='user_001', name='trip', users={'user_001', 'user_002'},
+                create_time=datetime(1970, 1, 1, 0, 0, 1))
+    write_trip_memberships(trip=trip, user_ids_to_add=['user_002'], user_ids_to_update=['user_001'],
+                           attributes_to_update={'name': 'new trip'}, user_ids_to_delete=['user_003'])
+    cqls = [cql.split(' ')[0] for cql, _ in executions]
+    assert cqls == ['INSERT', 'UPDATE', 'DELETE']
+    assert executions[1][1] == ['new trip', 'user_001', 1000, 'trip_01']
+    assert executions[2][1] == ['user_003', 1000, 'trip_01']
@@ -0,0 +1,113 @@
+from datetime import datetime
+
+from cassandra.cqlengine import columns
+from cassandra.cqlengine.models import Model
+from cassandra.query import UNSET_VALUE
+
+from wonderline_app.db.cassandra import statements
+from wonderline_app.db.cassandra.statements import PreparedStatementRegistry, get_select_by_primary_key_cql, \
+    get_select_partition_cql, get_insert_cql, insert_models, get_update_statement, get_delete_statement
+
+
+class ItemsByUser(Model):
+    __keyspace__ = 'test'
+    __table_name__ = 'items_by_user'
+
+    user_id = columns.Text(primary_key=True)
+    create_time = columns.DateTime(primary_key=True, clustering_order="DESC")
+    item_id = columns.Text(primary_key=True, clustering_order="DESC")
+    name = columns.Text()
+
+
+class FakeSession:
+    def __init__(self):
+        self.prepared = []
+
+    def prepare(self, cql):
+        self.prepared.append(cql)
+        return cql
+
+
+def test_get_select_by_primary_key_cql():
+    assert get_select_by_primary_key_cql(ItemsByUser) == \
+        'SELECT "user_id", "create_time", "item_id", "name" FROM test.items_by_user ' \
+        'WHERE "user_id" = ? AND "create_time" = ? AND "item_id" = ?'
+
+
+def test_get_select_partition_cql():
+    assert get_select_partition_cql(ItemsByUser, 'user_id') == \
+        'SELECT "user_id", "create_time", "item_id", "name" FROM test.items_by_user WHERE "user_id" = ?'
+    assert get_select_partition_cql(ItemsByUser, 'user_id', order_by=['-create_time', 'item_id'], with_limit=True) == \
+        'SELECT "user_id", "create_time", "item_id", "name" FROM test.items_by_user ' \
+        'WHERE "user_id" = ? ORDER BY "create_time" DESC, "item_id" ASC LIMIT ?'
+    assert get_select_partition_cql(ItemsByUser, ['user_id', 'item_id'], order_by=['create_time'],
+                                    view='items_by_user_and_item') == \
+        'SELECT "user_id", "create_time", "item_id", "name" FROM test.items_by_user_and_item ' \
+        'WHERE "user_id" = ? AND "item_id" = ? ORDER BY "create_time" ASC'
+
+
+def test_statements_are_prepared_once_per_session(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(statements.connection, 'get_session', lambda: session)
+    registry = PreparedStatementRegistry()
+    registry.prepare(['SELECT 1', 'SELECT 2'])
+    registry.get('SELECT 1')
+    assert session.prepared == ['SELECT 1', 'SELECT 2']
+
+    new_session = FakeSession()
+    monkeypatch.setattr(statements.connection, 'get_session', lambda: new_session)
+    registry.get('SELECT 1')
+    assert new_session.prepared == ['SELECT 1']
+
+
+class FakeResultSet:
+    def __init__(self, rows):
+        self.current_rows = rows
+
+
+def test_get_models_by_primary_keys(monkeypatch):
+    rows_by_item_id = {'item_1': [{'user_id': 'user_001', 'create_time': None, 'item_id': 'item_1'}], 'item_2': []}
+    monkeypatch.setattr(statements.PREPARED_STATEMENTS, 'execute_concurrent', lambda cql, parameters_list: [
+        FakeResultSet(rows_by_item_id[parameters[-1]]) for parameters in parameters_list])
+    items = statements.get_models_by_primary_keys(ItemsByUser, [('user_001', None, 'item_1'), ('user_001', None, 'item_2')])
+    assert items[0].item_id == 'item_1'
+    assert items[1] is None
+    assert statements.get_models_by_primary_keys(ItemsByUser, []) == []
+
+
+def test_insert_models(monkeypatch):
+    executions = []
+    monkeypatch.setattr(statements.PREPARED_STATEMENTS, 'execute_concurrent_statements', executions.extend)
+    assert get_insert_cql(ItemsByUser) == \
+        'INSERT INTO test.items_by_user ("user_id", "create_time", "item_id", "name") VALUES (?, ?, ?, ?)'
+    insert_models([ItemsByUser(user_id='user_001', create_time=datetime(1970, 1, 1, 0, 0, 1), item_id='item_1')])
+    # the missing name is left unset instead of being written as null
+    assert executions == [(get_insert_cql(ItemsByUser), ['user_001', 1000, 'item_1', UNSET_VALUE])]
+
+
+def test_get_update_and_delete_statements():
+    primary_key_values = ('user_001', datetime(1970, 1, 1, 0, 0, 1), 'item_1')
+    assert get_update_statement(ItemsByUser, primary_key_values, {'name': 'item'}) == (
+        'UPDATE test.items_by_user SET "name" = ? WHERE "user_id" = ? AND "create_time" = ? AND "item_id" = ?',
+        ['item', 'user_001', 1000, 'item_1'])
+    assert get_delete_statement(ItemsByUser, primary_key_values) == (
+        'DELETE FROM test.items_by_user WHERE "user_id" = ? AND "create_time" = ? AND "item_id" = ?',
+        ['user_001', 1000, 'item_1'])
+
+
+def test_get_models_by_partition_keys(monkeypatch):
+    executions = []
+
+    def execute(cql, parameters):
+        executions.append((cql, parameters))
+        return [{'user_id': 'user_001', 'create_time': None, 'item_id': 'item_1'}]
+
+    monkeypatch.setattr(statements.PREPARED_STATEMENTS, 'execute', execute)
+    items = statements.get_models_by_partition_keys(ItemsByUser, ['user_001', 'user_002'])
+    assert [item.item_id for item in items] == ['item_1']
+    assert executions == [(
+        'SELECT "user_id", "create_time", "item_id", "name" FROM test.items_by_user WHERE "user_id" IN ?',
+        [['user_001', 'user_002']])]
+    # a partition deletion only needs the partition key
+    assert get_delete_statement(ItemsByUser, ('user_001',)) == (
+        'DELETE FROM test.items_by_user WHERE "user_id" = ?', ['user_001'])
@@ -1,6 +1,8 @@
 import pytest
 
+from wonderline_app.db.cassandra import utils
 from wonderline_app.db.cassandra.utils import convert_sort_by
+from wonderline_app.utils import encode_cursor
 
 
 @pytest.mark.parametrize(
@@ -15,3 +17,102 @@ from wonderline_app.db.cassandra.utils import convert_sort_by
 )
 def test_convert_sort_by(sort_by, expected):
     assert convert_sort_by(sort_by) == expected
+
+
+class Item:
+    def __init__(self, item_id, access_level='everyone'):
+        self.item_id = item_id
+        self.access_level = access_level
+
+
+class FakeResultSet:
+    def __init__(self, rows, paging_state=None):
+        self.current_rows = rows
+        self.paging_state = paging_state
+
+
+@pytest.fixture
+def fake_partition(monkeypatch):
+    """Partition of 5 items, the paging state being the index of the next item."""
+    items = [Item('item_0'), Item('item_1', 'only_me'), Item('item_2'), Item('item_3'), Item('item_4')]
+    executions = []
+
+    def execute(cql, parameters, fetch_size=None, paging_state=None):
+        executions.append((fetch_size, paging_state))
+        start = int.from_bytes(paging_state, 'big') if paging_state else 0
+        end = start + fetch_size
+        return FakeResultSet(items[start:end], end.to_bytes(1, 'big') if end < len(items) else None)
+
+    monkeypatch.setattr(utils.PREPARED_STATEMENTS, 'execute', execute)
+    monkeypatch.setattr(utils, 'construct_models', lambda cls, rows: list(rows))
+    monkeypatch.setattr(utils, 'get_select_partition_cql', lambda *args, **kwargs: 'cql')
+    return executions
+
+
+def test_get_filtered_models_page_from_access_level_view(monkeypatch):
+    class ItemsByUser:
+        ACCESS_LEVEL_VIEW = 'items_by_user_and_access_level'
+
+    executions = []
+
+    def execute(cql, parameters, fetch_size=None, paging_state=None):
+        executions.append((cql, parameters))
+        return FakeResultSet([Item('item_0'), Item('item_1', 'only_me')])
+
+    monkeypatch.setattr(utils.PREPARED_STATEMENTS, 'execute', execute)
+    monkeypatch.setattr(utils, 'construct_models', lambda cls, rows: list(rows))
+    monkeypatch.setattr(utils, 'get_select_partition_cql', lambda cls, partition_key, order_by, view=None: (
+        f"{partition_key} FROM {view}"))
+    items, _ = utils.get_filtered_models_page(
+        cls=ItemsByUser, primary_key='user_id', id_value='user_001', nb=2, access_level='everyone')
+    # the view is trusted to filter the items
+    assert [item.item_id for item in items] == ['item_0', 'item_1']
+    utils.get_filtered_models_page(cls=ItemsByUser, primary_key='user_id', id_value='user_001', nb=2)
+    assert executions == [
+        ("['user_id', 'access_level'] FROM items_by_user_and_access_level", ['user_001', 'everyone']),
+        ("user_id FROM None", ['user_001']),
+    ]
+
+
+def test_get_filtered_models_page_with_cursor(fake_partition):
+    items, cursor = utils.get_filtered_models_page(cls=None, primary_key='user_id', id_value='user_001', nb=2)
+    assert [item.item_id for item in items] == ['item_0', 'item_1']
+    items, cursor = utils.get_filtered_models_page(
+        cls=None, primary_key='user_id', id_value='user_001', nb=2, cursor=cursor)
+    assert [item.item_id for item in items] == ['item_2', 'item_3']
+    items, cursor = utils.get_filtered_models_page(
+        cls=None, primary_key='user_id', id_value='user_001', nb=2, cursor=cursor)
+    assert [item.item_id for item in items] == ['item_4']
+    assert cursor is None
+    # the pages after the first one are read from where the previous one stopped
+    assert fake_partition == [(2, None), (2, b'\x02'), (2, b'\x04')]
+
+
+def test_get_filtered_models_page_with_start_index(fake_partition):
+    items, cursor = utils.get_filtered_models_page(
+        cls=None, primary_key='user_id', id_value='user_001', nb=2, start_index=1, access_level='everyone')
+    assert [item.item_id for item in items] == ['item_2']
+    items, _ = utils.get_filtered_models_page(cls=None, primary_key='user_id', id_value='user_001', nb=2,
+                                              start_index=1, access_level='everyone', cursor=cursor)
+    assert [item.item_id for item in items] == ['item_3', 'item_4']
+
+
+@pytest.mark.parametrize("cursor", ["invalid", encode_cursor([]), encode_cursor(["not hex"]),
+                                    encode_cursor(["not hex", *utils._get_page_query('cql', ['user_001'], None, 0)])])
+def test_get_filtered_models_page_with_invalid_cursor(fake_partition, cursor):
+    with pytest.raises(ValueError):
+        utils.get_filtered_models_page(cls=None, primary_key='user_id', id_value='user_001', cursor=cursor)
+
+
+@pytest.mark.parametrize("query", [
+    dict(id_value='user_002'),
+    dict(access_level='only_me'),
+    dict(start_index=1),
+    dict(sort_by='-createTime'),
+])
+def test_get_filtered_models_page_with_cursor_of_another_query(monkeypatch, fake_partition, query):
+    monkeypatch.setattr(utils, 'get_select_partition_cql', lambda cls, partition_key, order_by, view=None: str(order_by))
+    _, cursor = utils.get_filtered_models_page(cls=None, primary_key='user_id', id_value='user_001', nb=2)
+    with pytest.raises(ValueError, match="was issued for"):
+        utils.get_filtered_models_page(
+            cls=None, **{'primary_key': 'user_id', 'id_value': 'user_001', 'nb': 2, **query}, cursor=cursor)
@@ -0,0 +1,150 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+
+from wonderline_app.cache.memory import LRUCache
+from wonderline_app.core.search_index import UserSearchIndex
+from wonderline_app.db.postgres import models
+from wonderline_app.db.postgres.exceptions import UserNotFound, UserPrincipalNotFound
+from wonderline_app.db.postgres.models import User, UserPrincipal
+from wonderline_app.utils import encode_cursor
+
+
+def test_user_principal_loads_the_user_lazily(monkeypatch):
+    loaded_user_ids = []
+
+    def get(user_id):
+        loaded_user_ids.append(user_id)
+        return User(id=user_id, email='jon@gmail.com')
+
+    monkeypatch.setattr(User, 'get', get)
+    principal = UserPrincipal('user_001')
+    assert principal.id == 'user_001'
+    assert principal.get_id() == 'user_001'
+    assert principal.is_authenticated
+    assert not loaded_user_ids
+    assert principal.email == 'jon@gmail.com'
+    assert principal.user.email == 'jon@gmail.com'
+    assert loaded_user_ids == ['user_001']
+
+
+def test_user_principal_of_a_deleted_user(monkeypatch):
+    def get(user_id):
+        raise UserNotFound(f'User {user_id} is not found')
+
+    monkeypatch.setattr(User, 'get', get)
+    principal = UserPrincipal('user_001')
+    assert principal.id == 'user_001'
+    with pytest.raises(UserPrincipalNotFound):
+        principal.email
+
+
+def test_users_by_groups_are_limited_per_group_in_the_query(monkeypatch):
+    statements = []
+
+    def all_rows(query):
+        statements.append(query.statement.compile(dialect=postgresql.dialect()))
+        return []
+
+    monkeypatch.setattr(Query, 'all', all_rows)
+    users_by_trip = User.get_users_by_groups(
+        user_ids_by_group={'trip_01': ['user_001', 'user_002'], 'trip_02': ['user_002']},
+        sort_by='nickName', sort_desc=False, user_nb=6)
+    assert users_by_trip == {'trip_01': [], 'trip_02': []}
+    statement, = statements
+    assert 'row_number() OVER (PARTITION BY memberships.group_id ORDER BY _user.nick_name ASC' in str(statement)
+    assert statement.params['groups'] == ['trip_01', 'trip_01', 'trip_02']
+    assert statement.params['user_ids'] == ['user_001', 'user_002', 'user_002']
+    assert statement.params['rank_1'] == 6
+
+
+def test_follow_edge_is_read_again_once_expired(monkeypatch):
+    cache = LRUCache(namespace='follow_edges', max_size=10, ttl=60)
+    monkeypatch.setattr(models, 'FOLLOW_EDGE_CACHE', cache)
+    lookups = []
+
+    class FakeQuery:
+        def __init__(self, is_followed):
+            self.is_followed = is_followed
+
+        def scalar(self):
+            lookups.append(self.is_followed)
+            return self.is_followed
+
+    monkeypatch.setattr(models.db_session, 'query', lambda clause: FakeQuery(is_followed=len(lookups) > 0))
+    jon = User(id='user_001')
+    assert not jon.is_followed_by('user_002')
+    assert not jon.is_followed_by('user_002')  # cached
+    # user_002 follows user_001, which is seen once the cached edge expires
+    now = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: now + 61)
+    assert jon.is_followed_by('user_002')
+    assert lookups == [False, True]
+
+
+def test_search_users_ranks_and_pages_in_the_query(monkeypatch):
+    statements = []
+
+    def all_rows(query):
+        statements.append(query.statement.compile(dialect=postgresql.dialect()))
+        return []
+
+    monkeypatch.setattr(Query, 'all', all_rows)
+    assert User.search_users(name_query='jon_s%', start_index=12, nb=6) == []
+    statement, = statements
+    sql = str(statement)
+    assert '_user.nick_name ILIKE %(nick_name_1)s ESCAPE' in sql
+    assert '_user.unique_name ILIKE %(unique_name_1)s ESCAPE' in sql
+    assert 'ORDER BY greatest(similarity(_user.nick_name, %(similarity_1)s), ' \
+           'similarity(_user.unique_name, %(similarity_2)s)) DESC, _user.id' in sql
+    # the LIKE wildcards of the query are escaped
+    assert statement.params['nick_name_1'] == '%jon\\_s\\%%'
+    assert 'LIMIT %(param_1)s OFFSET %(param_2)s' in sql
+    assert statement.params['param_1'] == 6
+    assert statement.params['param_2'] == 12
+
+
+def test_search_users_from_postgresql_until_the_search_index_is_built(monkeypatch):
+    queried_names = []
+
+    def all_rows(query):
+        queried_names.append(query.statement.compile(dialect=postgresql.dialect()).params['similarity_1'])
+        return []
+
+    monkeypatch.setattr(Query, 'all', all_rows)
+    index = UserSearchIndex()
+    monkeypatch.setattr(models, 'USER_SEARCH_INDEX', index)
+    assert User.search_users(name_query='snow') == []
+    assert queried_names == ['snow']
+    index.build([{'id': 'user_001', 'nickName': 'Jon Snow', 'uniqueName': 'jon_snow'}])
+    assert [user['id'] for user in User.search_users(name_query='snow')] == ['user_001']
+    assert queried_names == ['snow']
+
+
+def test_followers_page_is_sorted_by_the_indexed_follow_columns(monkeypatch):
+    statements = []
+
+    def all_rows(query):
+        statements.append(query.statement.compile(dialect=postgresql.dialect()))
+        return []
+
+    monkeypatch.setattr(Query, 'all', all_rows)
+    user = User(id='user_001')
+    cursor = User._encode_followers_cursor(
+        sort_by='createTime', sort_value=datetime(2020, 7, 30, tzinfo=timezone.utc), user_id='user_005')
+    assert user.get_followers_page(follower_nb=2, cursor=cursor) == ([], None)
+    statement, = statements
+    sql = str(statement)
+    assert '(followed.to_create_time, followed.to_id) < (%(param_1)s, %(param_2)s)' in sql
+    assert 'ORDER BY followed.to_create_time DESC, followed.to_id DESC' in sql
+    assert statement.params['param_1'] == datetime(2020, 7, 30, tzinfo=timezone.utc)
+    assert statement.params['param_2'] == 'user_005'
+
+
+def test_followers_cursor_of_another_sort_type_is_rejected():
+    cursor = encode_cursor(['nickName', 'Jon Snow', 'user_005'])
+    with pytest.raises(ValueError):
+        User(id='user_001').get_followers_page(follower_nb=2, cursor=cursor)
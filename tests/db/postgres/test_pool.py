@@ -0,0 +1,20 @@
+import sqlite3
+
+import pytest
+from sqlalchemy.exc import TimeoutError
+
+from wonderline_app.db.postgres.pool import MeteredQueuePool
+
+
+def test_metered_pool_records_checkouts_and_occupancy():
+    pool = MeteredQueuePool(lambda: sqlite3.connect(':memory:'), pool_size=1, max_overflow=0, timeout=0.01)
+    connection = pool.connect()
+    metrics = pool.get_metrics()
+    assert metrics["checkouts"] == 1
+    assert metrics["checkedOut"] == 1
+    with pytest.raises(TimeoutError):
+        pool.connect()
+    assert pool.get_metrics()["timeouts"] == 1
+    assert pool.get_metrics()["maxWaitMs"] >= 10
+    connection.close()
+    assert pool.get_metrics()["checkedOut"] == 0
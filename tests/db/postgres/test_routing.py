@@ -0,0 +1,90 @@
+from sqlalchemy import create_engine, Column, TEXT
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+
+from wonderline_app.db.postgres.routing import RoutingSession, ReplicaLagMonitor
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = 'item'
+    id = Column(TEXT, primary_key=True)
+
+
+class StubLagMonitor(ReplicaLagMonitor):
+    def __init__(self, lag):
+        super().__init__(replica=None, max_lag=1, check_interval=0)
+        self._lag = lag
+
+    def _get_lag(self):
+        return self._lag
+
+
+def _create_engine(item_id: str):
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    engine.execute(Item.__table__.insert(), id=item_id)
+    return engine
+
+
+def _create_session(lag=0.):
+    primary, replica = _create_engine('primary'), _create_engine('replica')
+    return sessionmaker(class_=RoutingSession, bind=primary, replica=replica, replica_monitor=StubLagMonitor(lag))()
+
+
+def _read_item_ids(session: RoutingSession, from_replica: bool) -> set:
+    if from_replica and session.can_use_replica():
+        session.replica_depth += 1
+    try:
+        return {row.id for row in session.query(Item.id)}
+    finally:
+        session.replica_depth = 0
+
+
+def test_reads_from_replica_only_when_requested():
+    session = _create_session()
+    assert _read_item_ids(session, from_replica=True) == {'replica'}
+    assert _read_item_ids(session, from_replica=False) == {'primary'}
+
+
+def test_falls_back_to_primary_when_replica_lags():
+    session = _create_session(lag=10.)
+    assert _read_item_ids(session, from_replica=True) == {'primary'}
+
+
+def test_sticks_to_primary_after_writes():
+    session = _create_session()
+    session.add(Item(id='new'))
+    assert not session.can_use_replica()
+    session.commit()
+    assert _read_item_ids(session, from_replica=True) == {'primary', 'new'}
+    assert not session.can_use_replica()
+
+
+class FakeReplica:
+    def __init__(self, row):
+        self.row = row
+
+    def connect(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query):
+        return self
+
+    def first(self):
+        return self.row
+
+
+def test_replica_lag_is_zero_while_the_primary_is_idle():
+    # no transaction replayed for an hour, but all the received WAL is replayed
+    assert ReplicaLagMonitor(replica=FakeReplica((True, 3600.)), max_lag=1).is_usable()
+    lagging_monitor = ReplicaLagMonitor(replica=FakeReplica((False, 3600.)), max_lag=1)
+    assert not lagging_monitor.is_usable()
+    assert lagging_monitor.lag == 3600.
@@ -0,0 +1,38 @@
+from wonderline_app.db.loaders import BatchLoader
+
+
+class FakeBatchLoad:
+    def __init__(self, values):
+        self.values = values
+        self.calls = []
+
+    def __call__(self, keys):
+        self.calls.append(sorted(keys))
+        return {k: self.values[k] for k in keys if k in self.values}
+
+
+def test_batch_loader_fetches_primed_keys_in_one_call():
+    batch_load = FakeBatchLoad({"user_001": "jon", "user_002": "daenerys"})
+    loader = BatchLoader(batch_load)
+    loader.prime(["user_001", "user_002", None])
+    assert loader.load("user_001") == "jon"
+    assert loader.load("user_002") == "daenerys"
+    assert batch_load.calls == [["user_001", "user_002"]]
+
+
+def test_batch_loader_caches_missing_keys():
+    batch_load = FakeBatchLoad({"user_001": "jon"})
+    loader = BatchLoader(batch_load)
+    assert loader.load_many(["user_001", "user_009"]) == ["jon", None]
+    assert loader.load("user_009") is None
+    assert batch_load.calls == [["user_001", "user_009"]]
+
+
+def test_batch_loader_clear():
+    batch_load = FakeBatchLoad({"user_001": "jon"})
+    loader = BatchLoader(batch_load)
+    loader.load("user_001")
+    batch_load.values["user_001"] = "jon snow"
+    loader.clear("user_001")
+    assert loader.load("user_001") == "jon snow"
+    assert len(batch_load.calls) == 2
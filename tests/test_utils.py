@@ -1,7 +1,8 @@
 from datetime import datetime
 
 import pytest
-from wonderline_app.utils import convert_date_to_timestamp_in_expected_unit, edit_distance, TimeUnit
+from wonderline_app.utils import convert_date_to_timestamp_in_expected_unit, edit_distance, TimeUnit, encode_cursor, \
+    decode_cursor, edit_distances
 
 
 @pytest.mark.parametrize(
@@ -23,3 +24,29 @@ def test_convert_date_to_timestamp_in_expected_unit(expected_time_unit, expected
                           ])
 def test_edit_distance(word1, word2, expected_edit_dist):
     assert edit_distance(word1, word2) == expected_edit_dist
+
+
+@pytest.mark.parametrize(("word1", "word2", "max_distance", "expected_edit_dist"),
+                         [("intention", "execution", 5, 5),
+                          ("intention", "execution", 2, 3),
+                          ("", "execution", 3, 4),
+                          ("jon snow", "jon_snow", 0, 1)
+                          ])
+def test_edit_distance_with_max_distance(word1, word2, max_distance, expected_edit_dist):
+    assert edit_distance(word1, word2, max_distance=max_distance) == expected_edit_dist
+
+
+def test_edit_distances():
+    assert edit_distances("horse", ["ros", "horse", "", "house"]) == [3, 0, 5, 1]
+    assert edit_distances("horse", ["ros", "horse", "", "house"], max_distance=2) == [3, 0, 3, 1]
+
+
+def test_encode_and_decode_cursor():
+    cursor = encode_cursor(["2020-07-30T18:42:08.628000+00:00", "user_005"])
+    assert decode_cursor(cursor) == ["2020-07-30T18:42:08.628000+00:00", "user_005"]
+
+
+@pytest.mark.parametrize("cursor", ["invalid", "eyJhIjogMX0="])  # the second one is a dict, not a list
+def test_decode_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
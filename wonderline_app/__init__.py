@@ -4,6 +4,7 @@ Flask application entrypoint.
 import logging
 import os
 import secrets
+import threading
 from typing import Optional
 
 from cassandra.cqlengine.connection import setup
@@ -11,10 +12,16 @@ from flask import Flask
 from flask_login import LoginManager
 
 from wonderline_app.api import rest_api
-from wonderline_app.api.namespaces import users_namespace, trips_namespace, common_namespace, search_namespace
+from wonderline_app.api.namespaces import users_namespace, trips_namespace, common_namespace, search_namespace, \
+    metrics_namespace
+from wonderline_app.core.auth import AuthMode, get_auth_mode, decode_request_auth_token
 from wonderline_app.core.image_service import upload_encoded_image, upload_default_avatar_if_possible
+from wonderline_app.core.search_index import is_user_search_index_enabled
+from wonderline_app.db.cassandra.models import prepare_hot_statements
 from wonderline_app.db.minio.base import create_minio_bucket
-from wonderline_app.db.postgres.models import User
+from wonderline_app.db.postgres.init import db_session
+from wonderline_app.db.postgres.exceptions import UserTokenInvalid, UserTokenExpired
+from wonderline_app.db.postgres.models import User, UserPrincipal
 from wonderline_app.utils import set_logging
 
 LOGGER = logging.getLogger(__name__)
@@ -26,28 +33,52 @@ def _create_app():
         rest_api.add_namespace(search_namespace)
         rest_api.add_namespace(users_namespace)
         rest_api.add_namespace(trips_namespace)
+        if app.config.get('METRICS_TOKEN'):
+            rest_api.add_namespace(metrics_namespace)
+        else:
+            LOGGER.info("METRICS_TOKEN is not set, the metrics API is disabled")
         rest_api.init_app(app)
 
     def __setup_secret_key(app):
-        app.secret_key = secrets.token_urlsafe(32)
+        if not app.config.get('SECRET_KEY'):
+            LOGGER.warning("SECRET_KEY is not set, sessions and user tokens will only be valid on this worker")
+            app.secret_key = secrets.token_urlsafe(32)
 
     def __setup_login_manager(app):
         login_manager = LoginManager()
         login_manager.session_protection = 'strong'
         login_manager.init_app(app)
 
+        # the signed session or token is enough to trust the user id, the user itself is loaded on demand: a deleted
+        # user is only rejected (401) by the endpoints loading it
         @login_manager.user_loader
-        def load_user(user_id: str) -> Optional[User]:
+        def load_user(user_id: str) -> Optional[UserPrincipal]:
+            if get_auth_mode() == AuthMode.TOKEN:
+                return None  # session cookies are ignored by the stateless authentication
+            return UserPrincipal(user_id)
+
+        @login_manager.request_loader
+        def load_user_from_request(request) -> Optional[UserPrincipal]:
+            user_token = request.args.get('userToken')
+            if get_auth_mode() != AuthMode.TOKEN or not user_token:
+                return None
             try:
-                return User.get(user_id)
-            except Exception:
+                return UserPrincipal(decode_request_auth_token(user_token))
+            except (UserTokenInvalid, UserTokenExpired):
                 return None
 
+    def __setup_db_session(app):
+        @app.teardown_appcontext
+        def remove_db_session(exception=None):
+            # give the connection back to the pool as soon as the request is over
+            db_session.remove()
+
     app = Flask(__name__)
     app.config.from_object('wonderline_app.flask_config.BaseConfig')
     __init_rest_api(app)
     __setup_secret_key(app)
     __setup_login_manager(app)
+    __setup_db_session(app)
 
     return app
 
@@ -60,12 +91,53 @@ def _setup_cassandra():
         lazy_connect=True)
 
 
+def _prepare_cassandra_statements():
+    try:
+        prepare_hot_statements()
+    except Exception as e:
+        # the statements are prepared on first use instead
+        LOGGER.warning(f"Failed to prepare the Cassandra statements at start: {e}")
+
+
 def _setup_minio():
     create_minio_bucket(bucket_name=os.environ['MINIO_PHOTOS_BUCKET_NAME'])
 
 
+def _setup_user_search_index():
+    """
+    Build the in-memory user search index of this worker in the background, searches fall back to PostgreSQL until
+    it's built, so that the worker starts without waiting for the scan of every user.
+
+    Each worker only applies the user updates it handles itself (including the ones received during a build), so the
+    index is rebuilt every USER_SEARCH_INDEX_REFRESH_INTERVAL seconds to catch up with the other workers (0 disables
+    the refresh).
+    """
+    if not is_user_search_index_enabled():
+        return
+    refresh_interval = float(os.environ.get('USER_SEARCH_INDEX_REFRESH_INTERVAL', 300))
+
+    def build():
+        try:
+            User.build_search_index()
+        except Exception as e:
+            LOGGER.error(f"Failed to build the user search index: {e}")
+        finally:
+            db_session.remove()
+        if refresh_interval > 0:
+            schedule_build(refresh_interval)
+
+    def schedule_build(delay: float):
+        timer = threading.Timer(delay, build)
+        timer.daemon = True
+        timer.start()
+
+    schedule_build(0)
+
+
 APP = _create_app()
 set_logging(logging_config_file_path=os.environ.get('CONFIG_FILE_PATH', 'config.yml'))
 _setup_cassandra()
+_prepare_cassandra_statements()
 _setup_minio()
 upload_default_avatar_if_possible()
+_setup_user_search_index()
@@ -6,5 +6,6 @@ from wonderline_app.api.users.resources import User, Followers, UserHighlights,
 from wonderline_app.api.trips.resources import Trip, TripUsers, TripPhotos, TripPhoto, PhotoComments, CommentReplies, \
     NewTrip
 from wonderline_app.api.search.resources import SearchUser
+from wonderline_app.api.metrics.resources import Metrics
 
 rest_api = Api(version="v1.0a", title="Wondline APIs")
@@ -28,3 +28,11 @@ def create_res(namespace, name, payload_fields):
     return namespace.inherit(name, res_model, {
         "payload": payload_fields
     })
+
+
+def create_paginated_res(namespace, name, payload_fields):
+    """Response whose payload is a page of items, followed by the cursor of the next page."""
+    return namespace.inherit(name, res_model, {
+        "payload": payload_fields,
+        "nextCursor": fields.String(example="WyIyMDIwLTA3LTMwVDE4OjQyOjA4LjYyOCIsInVzZXJfMDA1Il0=")
+    })
@@ -0,0 +1,34 @@
+import hmac
+
+from flask import current_app
+from flask_restplus import Resource, reqparse
+
+from wonderline_app.api.namespaces import metrics_namespace
+from wonderline_app.db.postgres.init import get_pool_metrics, get_replica_pool_metrics
+
+metrics_parser = reqparse.RequestParser()
+metrics_parser.add_argument(
+    "X-Metrics-Token",
+    location='headers',
+    type=str,
+    help="METRICS_TOKEN of the server, the metrics expose the internals of the server.")
+
+
+def is_metrics_token_valid(token: str) -> bool:
+    expected_token = current_app.config.get('METRICS_TOKEN')
+    if not expected_token or not token:
+        return False
+    return hmac.compare_digest(token.encode('utf-8'), expected_token.encode('utf-8'))
+
+
+@metrics_namespace.route("")
+class Metrics(Resource):
+    @metrics_namespace.expect(metrics_parser)
+    def get(self):
+        args = metrics_parser.parse_args()
+        if not is_metrics_token_valid(args.get("X-Metrics-Token")):
+            metrics_namespace.abort(401, "Unauthorized: metrics token is invalid")
+        return {
+            "postgresPool": get_pool_metrics(),
+            "postgresReplicaPool": get_replica_pool_metrics()
+        }
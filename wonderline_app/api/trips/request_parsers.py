@@ -43,6 +43,11 @@ trip_photos_parser.add_argument(
     choices=get_enum_names(AccessLevel),
     location='args',
     default=AccessLevel.EVERYONE.value)
+trip_photos_parser.add_argument(
+    'cursor',
+    type=str,
+    location='args',
+    help="nextCursor of the previous page, the other arguments must be the same as for the first page")
 
 trip_photo_parser = common_parser.copy()
 trip_photo_parser.add_argument(
@@ -50,7 +55,8 @@ trip_photo_parser.add_argument(
     type=str,
     choices=get_enum_names(SortType),
     location='args',
-    default=SortType.CREATE_TIME.value)
+    default=SortType.CREATE_TIME.value,
+    help="ignored, the liked users preview is the first likes of the photo in user id order")
 trip_photo_parser.add_argument(
     'likedUserNb',
     type=int,
@@ -12,8 +12,8 @@ from wonderline_app.api.trips.request_models.models import trip_creation_model,
     photo_update_model, photos_delete_model, photos_update_model, original_comment_model, comment_update_model
 from wonderline_app.api.trips.request_parsers import trip_parser, trip_users_parser, trip_photos_parser, \
     trip_photo_parser, photo_comments_parser, comment_replies_parser
-from wonderline_app.api.trips.responses import trip_res, trip_users_res, trip_photos_res, trip_photo_res, \
-    photo_comments_res, comment_replies_res, comment_res, reply_res
+from wonderline_app.api.trips.responses import trip_res, trip_users_res, trip_photos_res, trip_photos_page_res, \
+    trip_photo_res, photo_comments_res, comment_replies_res, comment_res, reply_res
 from wonderline_app.core.api_logics import handle_request, get_complete_trip, get_users_by_trip, \
     get_photos_by_trip, get_photo_details, get_comments_by_photo, get_replies_by_comment, create_new_trip, update_trip, \
     upload_trip_photos, update_trip_photo, delete_trip_photos, update_trip_photos, create_new_reply, create_new_comment, \
@@ -76,7 +76,7 @@ class TripUsers(Resource):
 @trips_namespace.route("/<string:tripId>/photos")
 class TripPhotos(Resource):
     @trips_namespace.expect(trip_photos_parser)
-    @trips_namespace.marshal_with(trip_photos_res)
+    @trips_namespace.marshal_with(trip_photos_page_res)
     def get(self, tripId):
         args = trip_photos_parser.parse_args()
         user_token = args.get("userToken")
@@ -84,6 +84,7 @@ class TripPhotos(Resource):
         nb = args.get("nb")
         start_index = args.get("startIndex")
         access_level = args.get("accessLevel")
+        cursor = args.get("cursor")
         return handle_request(
             func=get_photos_by_trip,
             user_token=user_token,
@@ -91,7 +92,8 @@ class TripPhotos(Resource):
             sort_type=sort_type,
             nb=nb,
             start_index=start_index,
-            access_level=access_level
+            access_level=access_level,
+            cursor=cursor
         )
 
     @trips_namespace.expect(common_parser, photo_upload_model, validate=True)
@@ -144,7 +146,6 @@ class TripPhoto(Resource):
     def get(self, tripId, photoId):
         args = trip_photo_parser.parse_args()
         user_token = args.get("userToken")
-        liked_users_sort_type = args.get("likedUsersSortType")
         liked_user_nb = args.get("likedUserNb")
         comments_sort_type = args.get("commentsSortType")
         comment_nb = args.get("commentNb")
@@ -153,7 +154,6 @@ class TripPhoto(Resource):
             user_token=user_token,
             trip_id=tripId,
             photo_id=photoId,
-            liked_users_sort_type=liked_users_sort_type,
             liked_user_nb=liked_user_nb,
             comments_sort_type=comments_sort_type,
             comment_nb=comment_nb
@@ -4,7 +4,7 @@ Definition of Trip API responses.
 from flask_restplus import fields
 
 from wonderline_app.api.namespaces import trips_namespace
-from wonderline_app.api.common.responses import create_res
+from wonderline_app.api.common.responses import create_res, create_paginated_res
 from wonderline_app.api.trips.response_models.models import trip_model, reduced_photo_model
 from wonderline_app.api.trips.response_models.sub_models import photo_model, comment_model, reply_model
 from wonderline_app.api.users.response_models.models import reduced_user_model
@@ -18,6 +18,9 @@ trip_users_res = create_res(trips_namespace, "TripUsersResponse",
 trip_photos_res = create_res(trips_namespace, "TripPhotosResponse",
                              fields.List(fields.Nested(reduced_photo_model)))
 
+trip_photos_page_res = create_paginated_res(trips_namespace, "TripPhotosPageResponse",
+                                            fields.List(fields.Nested(reduced_photo_model)))
+
 trip_photo_res = create_res(trips_namespace, "TripPhotoResponse",
                             fields.Nested(photo_model))
 
@@ -36,6 +36,11 @@ followers_parser.add_argument(
     type=int,
     location='args',
     default=50)
+followers_parser.add_argument(
+    'cursor',
+    type=str,
+    location='args',
+    help="nextCursor of the previous page, startIndex is ignored when it's set")
 
 # Similar structure as followers_parser
 user_trips_parser = followers_parser.copy()
@@ -50,6 +55,11 @@ user_trips_parser.add_argument(
     choices=get_enum_names(AccessLevel),
     location='args',
     default=AccessLevel.EVERYONE.value)
+user_trips_parser.replace_argument(
+    'cursor',
+    type=str,
+    location='args',
+    help="nextCursor of the previous page, the other arguments must be the same as for the first page")
 
 # Same structure as user_trips_parser
 user_highlights_parser = user_trips_parser.copy()
@@ -48,13 +48,15 @@ class Followers(Resource):
         sort_type = args.get("sortType")
         nb = args.get("nb")
         start_index = args.get("startIndex")
+        cursor = args.get("cursor")
         return handle_request(
             func=get_user_followers,
             user_id=userId,
             user_token=user_token,
             sort_type=sort_type,
             nb=nb,
-            start_index=start_index)
+            start_index=start_index,
+            cursor=cursor)
 
 
 @users_namespace.route("/<string:userId>/trips")
@@ -68,6 +70,7 @@ class UserTrips(Resource):
         nb = args.get("nb")
         start_index = args.get("startIndex")
         access_level = args.get("accessLevel")
+        cursor = args.get("cursor")
         return handle_request(
             func=get_trips_by_user,
             user_token=user_token,
@@ -75,7 +78,8 @@ class UserTrips(Resource):
             sort_type=sort_type,
             nb=nb,
             start_index=start_index,
-            access_level=access_level
+            access_level=access_level,
+            cursor=cursor
         )
 
 
@@ -90,6 +94,7 @@ class UserHighlights(Resource):
         nb = args.get("nb")
         start_index = args.get("startIndex")
         access_level = args.get("accessLevel")
+        cursor = args.get("cursor")
         return handle_request(
             func=get_highlights_by_user,
             user_token=user_token,
@@ -97,7 +102,8 @@ class UserHighlights(Resource):
             sort_type=sort_type,
             nb=nb,
             start_index=start_index,
-            access_level=access_level
+            access_level=access_level,
+            cursor=cursor
         )
 
 
@@ -112,6 +118,7 @@ class UserAlbums(Resource):
         nb = args.get("nb")
         start_index = args.get("startIndex")
         access_level = args.get("accessLevel")
+        cursor = args.get("cursor")
         return handle_request(
             func=get_albums_by_user,
             user_token=user_token,
@@ -119,7 +126,8 @@ class UserAlbums(Resource):
             sort_type=sort_type,
             nb=nb,
             start_index=start_index,
-            access_level=access_level
+            access_level=access_level,
+            cursor=cursor
         )
 
 
@@ -134,6 +142,7 @@ class UserMentions(Resource):
         nb = args.get("nb")
         start_index = args.get("startIndex")
         access_level = args.get("accessLevel")
+        cursor = args.get("cursor")
         return handle_request(
             func=get_mentions_by_user,
             user_token=user_token,
@@ -141,7 +150,8 @@ class UserMentions(Resource):
             sort_type=sort_type,
             nb=nb,
             start_index=start_index,
-            access_level=access_level
+            access_level=access_level,
+            cursor=cursor
         )
 
 
@@ -0,0 +1,36 @@
+"""
+Caches shared by the models.
+
+The backend is chosen with the environment variable CACHE_BACKEND:
+ - `memory` (default): one LRU cache per worker.
+ - `shared_memory`: one cache per host, shared by all the gunicorn workers through a memory-mapped file.
+ - `redis`: one cache for every worker and node, stored in the Redis server at REDIS_URL.
+"""
+import os
+from enum import Enum
+from typing import Optional
+
+from wonderline_app.cache.base import Cache
+from wonderline_app.cache.memory import LRUCache
+from wonderline_app.cache.redis_cache import RedisCache
+from wonderline_app.cache.shared_memory import SharedMemoryCache
+
+
+class CacheBackend(Enum):
+    MEMORY = 'memory'
+    SHARED_MEMORY = 'shared_memory'
+    REDIS = 'redis'
+
+
+def create_cache(namespace: str, max_size: int, ttl: Optional[float] = None) -> Cache:
+    """Create a cache with the configured backend, a `max_size` of 0 disables caching."""
+    backend = CacheBackend(os.environ.get('CACHE_BACKEND', CacheBackend.MEMORY.value))
+    if not max_size or backend == CacheBackend.MEMORY:
+        return LRUCache(namespace=namespace, max_size=max_size, ttl=ttl)
+    if backend == CacheBackend.SHARED_MEMORY:
+        return SharedMemoryCache(
+            namespace=namespace,
+            max_size=max_size,
+            ttl=ttl,
+            slot_size=int(os.environ.get('CACHE_SHARED_MEMORY_SLOT_SIZE', 512)))
+    return RedisCache(namespace=namespace, ttl=ttl, url=os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
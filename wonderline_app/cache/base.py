@@ -0,0 +1,59 @@
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class Cache(ABC):
+    """
+    Key-value cache shared by the user, trip and serialized-payload caches.
+
+    Keys are strings, values must be JSON serializable so that they can be stored by the cross-process backends.
+    Entries older than `ttl` seconds are treated as missing, a `ttl` of None means no expiration.
+    """
+
+    def __init__(self, namespace: str, ttl: Optional[float] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Return the cached values of the given keys, missing keys are absent from the result."""
+        keys = list(keys)
+        values = self._get_many(keys) if keys else {}
+        with self._stats_lock:
+            self.hits += len(values)
+            self.misses += len(keys) - len(values)
+        return values
+
+    def set(self, key: str, value: Any):
+        self.set_many({key: value})
+
+    @abstractmethod
+    def _get_many(self, keys: List[str]) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def set_many(self, mapping: Dict[str, Any]):
+        pass
+
+    @abstractmethod
+    def delete(self, key: str):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self).__name__,
+            "namespace": self.namespace,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from wonderline_app.cache.base import Cache
+
+
+class LRUCache(Cache):
+    """
+    In-process cache bounded in size, evicting the least recently used entries first.
+
+    Every worker holds its own copy. A `max_size` of 0 disables the cache.
+    """
+
+    def __init__(self, namespace: str = 'default', max_size: int = 1024, ttl: Optional[float] = None):
+        if max_size < 0:
+            raise ValueError(f"max_size is expected to be non-negative, got {max_size}")
+        super().__init__(namespace=namespace, ttl=ttl)
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (expire_time, value)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get_many(self, keys: List[str]) -> Dict[str, Any]:
+        values = {}
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expire_time, value = entry
+                if expire_time is not None and expire_time <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                values[key] = value
+        return values
+
+    def set_many(self, mapping: Dict[str, Any]):
+        if not self.max_size:
+            return
+        with self._lock:
+            expire_time = time.monotonic() + self.ttl if self.ttl else None
+            for key, value in mapping.items():
+                self._entries[key] = (expire_time, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats,
+            "size": len(self._entries),
+            "maxSize": self.max_size,
+        }
@@ -0,0 +1,63 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from wonderline_app.cache.base import Cache
+
+LOGGER = logging.getLogger(__name__)
+
+
+class RedisCache(Cache):
+    """
+    Cache shared by every worker and node, stored in Redis (or any server speaking its wire protocol).
+
+    Keys are prefixed by the namespace. When the server is unreachable, reads are treated as misses and writes are
+    skipped, so that the cache never breaks a request.
+    """
+
+    def __init__(self, namespace: str = 'default', ttl: Optional[float] = None, url: str = 'redis://localhost:6379/0',
+                 client=None):
+        super().__init__(namespace=namespace, ttl=ttl)
+        if client is None:
+            import redis  # only required by this backend
+            client = redis.Redis.from_url(url)
+        self._client = client
+
+    def _build_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _get_many(self, keys: List[str]) -> Dict[str, Any]:
+        try:
+            raw_values = self._client.mget([self._build_key(key) for key in keys])
+        except Exception as e:
+            LOGGER.warning(f"Failed to read the cache {self.namespace} from Redis: {e}")
+            return {}
+        return {key: json.loads(raw_value) for key, raw_value in zip(keys, raw_values) if raw_value is not None}
+
+    def set_many(self, mapping: Dict[str, Any]):
+        if not mapping:
+            return
+        expire_in_ms = int(self.ttl * 1000) if self.ttl else None
+        try:
+            pipeline = self._client.pipeline(transaction=False)
+            for key, value in mapping.items():
+                pipeline.set(self._build_key(key), json.dumps(value, separators=(',', ':')), px=expire_in_ms)
+            pipeline.execute()
+        except Exception as e:
+            LOGGER.warning(f"Failed to write the cache {self.namespace} into Redis: {e}")
+
+    def delete(self, key: str):
+        try:
+            self._client.delete(self._build_key(key))
+        except Exception as e:
+            LOGGER.error(f"Failed to invalidate the key {key} of the cache {self.namespace} in Redis: {e}")
+
+    def clear(self):
+        try:
+            keys = list(self._client.scan_iter(match=self._build_key('*')))
+            if keys:
+                self._client.delete(*keys)
+        except Exception as e:
+            LOGGER.error(f"Failed to clear the cache {self.namespace} in Redis: {e}")
+        self.hits = 0
+        self.misses = 0
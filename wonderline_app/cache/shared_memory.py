@@ -0,0 +1,132 @@
+import fcntl
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from wonderline_app.cache.base import Cache
+
+LOGGER = logging.getLogger(__name__)
+
+
+class SharedMemoryCache(Cache):
+    """
+    Cache shared by all the workers of one host, backed by a memory-mapped file (in /dev/shm when available).
+
+    The file is a direct-mapped table of `max_size` fixed-size slots: a key always goes to the slot given by its hash
+    and overwrites whatever was stored there. Values which don't fit in a slot are not cached.
+    """
+    # key digest, expire timestamp (0 when the entry never expires), value length
+    _HEADER = struct.Struct('=16sdI')
+    _EMPTY_DIGEST = bytes(16)
+
+    def __init__(self, namespace: str = 'default', max_size: int = 1024, ttl: Optional[float] = None,
+                 slot_size: int = 512, directory: Optional[str] = None):
+        if max_size <= 0:
+            raise ValueError(f"max_size is expected to be positive, got {max_size}")
+        if slot_size <= self._HEADER.size:
+            raise ValueError(f"slot_size is expected to be larger than {self._HEADER.size}, got {slot_size}")
+        super().__init__(namespace=namespace, ttl=ttl)
+        self.max_size = max_size
+        self.slot_size = slot_size
+        if directory is None:
+            directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        # the layout is part of the file name so that workers with different settings never share a file
+        self.path = os.path.join(directory, f"wonderline_{namespace}_{max_size}x{slot_size}.cache")
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._mmap = None
+
+    def _open(self):
+        # file locks are shared with the parent process after a fork, so every worker opens its own file descriptor
+        if self._pid == os.getpid():
+            return
+        file_size = self.max_size * self.slot_size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size != file_size:
+                os.ftruncate(fd, file_size)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._fd = fd
+        self._mmap = mmap.mmap(fd, file_size)
+        self._pid = os.getpid()
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        # the thread lock protects the mapping within a worker, the file lock across workers
+        with self._lock:
+            self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield self._mmap
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _locate(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        offset = int.from_bytes(digest[:8], 'big') % self.max_size * self.slot_size
+        return digest, offset
+
+    def _get_many(self, keys: List[str]) -> Dict[str, Any]:
+        values = {}
+        now = time.time()
+        with self._locked(exclusive=False) as memory:
+            for key in keys:
+                digest, offset = self._locate(key)
+                stored_digest, expire_time, length = self._HEADER.unpack_from(memory, offset)
+                if stored_digest != digest or (expire_time and expire_time <= now):
+                    continue
+                start = offset + self._HEADER.size
+                try:
+                    values[key] = json.loads(memory[start:start + length].decode('utf-8'))
+                except ValueError:
+                    LOGGER.warning(f"Ignoring corrupted entry for key {key} in {self.path}")
+        return values
+
+    def set_many(self, mapping: Dict[str, Any]):
+        expire_time = time.time() + self.ttl if self.ttl else 0
+        entries = []
+        for key, value in mapping.items():
+            payload = json.dumps(value, separators=(',', ':')).encode('utf-8')
+            if self._HEADER.size + len(payload) > self.slot_size:
+                LOGGER.debug(f"Value of key {key} is too large for {self.path}, skip caching it")
+                continue
+            entries.append((self._locate(key), payload))
+        if not entries:
+            return
+        with self._locked(exclusive=True) as memory:
+            for (digest, offset), payload in entries:
+                self._HEADER.pack_into(memory, offset, digest, expire_time, len(payload))
+                start = offset + self._HEADER.size
+                memory[start:start + len(payload)] = payload
+
+    def delete(self, key: str):
+        digest, offset = self._locate(key)
+        with self._locked(exclusive=True) as memory:
+            if self._HEADER.unpack_from(memory, offset)[0] == digest:
+                self._HEADER.pack_into(memory, offset, self._EMPTY_DIGEST, 0, 0)
+
+    def clear(self):
+        with self._locked(exclusive=True) as memory:
+            for offset in range(0, self.max_size * self.slot_size, self.slot_size):
+                self._HEADER.pack_into(memory, offset, self._EMPTY_DIGEST, 0, 0)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats,
+            "maxSize": self.max_size,
+            "slotSize": self.slot_size,
+        }
@@ -6,18 +6,24 @@ import logging
 import multiprocessing
 from typing import Dict, List, Optional, Callable, Union, Tuple
 
+from flask import _request_ctx_stack
 from flask_login import login_user, current_user, logout_user
 from wonderline_app.api.common.enums import AccessLevel, SortType, SearchSortType
-from wonderline_app.core.api_responses.api_errors import APIError, APIError404, APIError500, APIError401, APIError409
+from wonderline_app.core.api_responses.api_errors import APIError, APIError404, APIError500, APIError401, \
+    APIError409, APIError400
 from wonderline_app.core.api_responses.api_feedbacks import APIFeedback201
+from wonderline_app.core.auth import AuthMode, get_auth_mode, decode_request_auth_token, revoke_auth_token
 from wonderline_app.core.image_service import ImageSize, upload_encoded_image, DEFAULT_AVATAR_URL
-from wonderline_app.core.api_responses.response import Response, Error, Feedback
+from wonderline_app.core.api_responses.response import Response, Error, Feedback, Page
 from wonderline_app.db.cassandra.exceptions import TripNotFound, CommentNotFound, PhotoNotFound, ReplyNotFound
 from wonderline_app.db.cassandra.models import AlbumsByUser, TripsByUser, HighlightsByUser, MentionsByUser, Trip, \
-    PhotosByTrip, Photo, create_and_return_new_trip, ReducedPhoto, delete_photos
+    PhotosByTrip, Photo, create_and_return_new_trip, ReducedPhoto, delete_photos, LikesByPhoto, \
+    write_trip_memberships
 from wonderline_app.db.cassandra.comments import Comment, CommentsByPhoto, CommentUtils
+from wonderline_app.db.cassandra.counters import PhotoCounters, increment_counter
+from wonderline_app.db.cassandra.statements import insert_models
 from wonderline_app.db.postgres.exceptions import UserNotFound, UserPasswordIncorrect, UserTokenInvalid, \
-    UserTokenExpired
+    UserTokenExpired, UserPrincipalNotFound
 from wonderline_app.db.postgres.models import User
 from wonderline_app.utils import get_current_timestamp, construct_location, infer_country_from_location, get_uuid
 
@@ -40,6 +46,8 @@ def handle_request(func: Callable, *args, **kwargs) -> Union[Dict, Tuple[Dict, i
         func_response = func(*args, **kwargs)
     except APIError as exp:
         response.add_error(Error(code=exp.code, message=exp.message))
+    except UserPrincipalNotFound as e:
+        response.add_error(APIError401(message=str(e)))
     except Exception as e:
         LOGGER.exception(e)
         response.add_error(APIError500(e))
@@ -47,6 +55,8 @@ def handle_request(func: Callable, *args, **kwargs) -> Union[Dict, Tuple[Dict, i
         if isinstance(func_response, tuple):  # (payload, feedback)
             response.payload = func_response[0]
             response.add_feedback(func_response[1])
+        elif isinstance(func_response, Page):
+            response.set_page(func_response)
         else:
             response.payload = func_response
     if response.has_errors:
@@ -63,15 +73,25 @@ def verify_user_token(user_token: str):
     if not len(user_token):
         raise APIError401(message="user token is empty")
     LOGGER.info(f"Verifying user token... got {user_token}")
+    try:
+        user_id = decode_request_auth_token(user_token)
+    except UserTokenInvalid:
+        raise APIError401(message="user token is invalid")
+    except UserTokenExpired:
+        raise APIError401(message="user token has expired")
     if current_user.is_anonymous:
         raise APIError401(message="Anonymous user can\'t access the resources")
-    else:
-        try:
-            current_user.verify_auth_token(user_token)
-        except UserTokenInvalid:
-            raise APIError401(message="user token is invalid")
-        except UserTokenExpired:
-            raise APIError401(message="user token has expired")
+    if current_user.id != user_id:
+        raise APIError401(message="user token is invalid")
+
+
+def _log_in(user: User) -> bool:
+    """Log the user in, with a Flask-Login session unless the authentication is stateless."""
+    if get_auth_mode() == AuthMode.TOKEN:
+        # only the current request is authenticated, as Flask-Login does without touching the session
+        _request_ctx_stack.top.user = user
+        return True
+    return login_user(user)
 
 
 def user_token_required(func):
@@ -137,75 +157,100 @@ def get_user_complete_attributes(user_id: str, followers_sort_type: str = SortTy
 
 @user_token_required
 def get_user_followers(user_id: str, sort_type: str = SortType.CREATE_TIME.value, nb: int = 50,
-                       start_index: int = 0) -> List:
+                       start_index: int = 0, cursor: Optional[str] = None) -> Page:
     """Get user's followers with reduced attributes"""
     user = _get_user(user_id=user_id)
     LOGGER.info(f"Getting followers for {user_id}")
-    return user.get_followers_with_reduced_attributes(
-        follower_nb=nb,
-        sort_by=sort_type,
-        start_index=start_index
-    )
+    try:
+        followers, next_cursor = user.get_followers_page(
+            follower_nb=nb,
+            sort_by=sort_type,
+            start_index=start_index,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise APIError400(message=str(e))
+    return Page(items=followers, next_cursor=next_cursor)
 
 
 @user_token_required
 def get_albums_by_user(user_id: str, sort_type: str = SortType.CREATE_TIME.value, nb: int = 3, start_index: int = 0,
-                       access_level: str = AccessLevel.EVERYONE.value) -> List[Dict]:
+                       access_level: str = AccessLevel.EVERYONE.value, cursor: Optional[str] = None) -> Page:
     """Get all the albums for the user."""
     user = _get_user(user_id=user_id)
     if user:
         LOGGER.info(f"Getting albums for user {user_id}")
-        return AlbumsByUser.get_albums(
-            user_id=user_id,
-            sort_by=sort_type,
-            nb=nb,
-            access_level=access_level,
-            start_index=start_index)
+        try:
+            albums, next_cursor = AlbumsByUser.get_albums_page(
+                user_id=user_id,
+                sort_by=sort_type,
+                nb=nb,
+                access_level=access_level,
+                start_index=start_index,
+                cursor=cursor)
+        except ValueError as e:
+            raise APIError400(message=str(e))
+        return Page(items=albums, next_cursor=next_cursor)
 
 
 @user_token_required
 def get_trips_by_user(user_id: str, sort_type: str = SortType.CREATE_TIME.value, nb: int = 3, start_index: int = 0,
-                      access_level: str = AccessLevel.EVERYONE.value) -> List[Dict]:
+                      access_level: str = AccessLevel.EVERYONE.value, cursor: Optional[str] = None) -> Page:
     """Get all the trips for the user."""
     user = _get_user(user_id=user_id)
     if user:
         LOGGER.info(f"Getting trips for user {user_id}")
-        return TripsByUser.get_trips(
-            user_id=user_id,
-            sort_by=sort_type,
-            nb=nb,
-            access_level=access_level,
-            start_index=start_index)
+        try:
+            trips, next_cursor = TripsByUser.get_trips_page(
+                user_id=user_id,
+                sort_by=sort_type,
+                nb=nb,
+                access_level=access_level,
+                start_index=start_index,
+                cursor=cursor)
+        except ValueError as e:
+            raise APIError400(message=str(e))
+        return Page(items=trips, next_cursor=next_cursor)
 
 
 @user_token_required
 def get_highlights_by_user(user_id: str, sort_type: str = SortType.CREATE_TIME.value, nb: int = 3, start_index: int = 0,
-                           access_level: str = AccessLevel.EVERYONE.value) -> List[Dict]:
+                           access_level: str = AccessLevel.EVERYONE.value, cursor: Optional[str] = None) -> Page:
     """Get all the highlights for the user."""
     user = _get_user(user_id=user_id)
     if user:
         LOGGER.info(f"Getting highlights for user {user_id}")
-        return HighlightsByUser.get_highlights(
-            user_id=user_id,
-            sort_by=sort_type,
-            nb=nb,
-            access_level=access_level,
-            start_index=start_index)
+        try:
+            highlights, next_cursor = HighlightsByUser.get_highlights_page(
+                user_id=user_id,
+                sort_by=sort_type,
+                nb=nb,
+                access_level=access_level,
+                start_index=start_index,
+                cursor=cursor)
+        except ValueError as e:
+            raise APIError400(message=str(e))
+        return Page(items=highlights, next_cursor=next_cursor)
 
 
 @user_token_required
 def get_mentions_by_user(user_id: str, sort_type: str = SortType.CREATE_TIME.value, nb: int = 12, start_index: int = 0,
-                         access_level: str = AccessLevel.EVERYONE.value) -> List[Dict]:
+                         access_level: str = AccessLevel.EVERYONE.value, cursor: Optional[str] = None) -> Page:
     """Get all the mentions for the user."""
     user = _get_user(user_id=user_id)
     if user:
         LOGGER.info(f"Getting mentions for user {user_id}")
-        return MentionsByUser.get_mentions(
-            user_id=user_id,
-            sort_by=sort_type,
-            nb=nb,
-            access_level=access_level,
-            start_index=start_index)
+        try:
+            mentions, next_cursor = MentionsByUser.get_mentions_page(
+                user_id=user_id,
+                sort_by=sort_type,
+                nb=nb,
+                access_level=access_level,
+                start_index=start_index,
+                cursor=cursor)
+        except ValueError as e:
+            raise APIError400(message=str(e))
+        return Page(items=mentions, next_cursor=next_cursor)
 
 
 @user_token_required
@@ -234,22 +279,27 @@ def get_users_by_trip(trip_id: str, sort_type: str = SortType.CREATE_TIME.value,
 
 @user_token_required
 def get_photos_by_trip(trip_id: str, sort_type: str = SortType.CREATE_TIME.value, nb: int = 12, start_index: int = 0,
-                       access_level: str = AccessLevel.EVERYONE.value) -> List[Dict]:
+                       access_level: str = AccessLevel.EVERYONE.value, cursor: Optional[str] = None) -> Page:
     """Get all the photos for the trip."""
     trip = get_trip(trip_id=trip_id)
     if trip:
         LOGGER.info(f"Getting users for trip {trip_id}")
-        return PhotosByTrip.get_filtered_photos(
-            trip_id=trip_id,
-            sort_by=sort_type,
-            nb=nb,
-            start_index=start_index,
-            access_level=access_level)
+        try:
+            photos, next_cursor = PhotosByTrip.get_filtered_photos_page(
+                trip_id=trip_id,
+                sort_by=sort_type,
+                nb=nb,
+                start_index=start_index,
+                access_level=access_level,
+                cursor=cursor)
+        except ValueError as e:
+            raise APIError400(message=str(e))
+        return Page(items=photos, next_cursor=next_cursor)
 
 
 @user_token_required
-def get_photo_details(trip_id: str, photo_id: str, liked_users_sort_type: str,
-                      liked_user_nb: int, comments_sort_type: str, comment_nb: int) -> Dict:
+def get_photo_details(trip_id: str, photo_id: str, liked_user_nb: int, comments_sort_type: str,
+                      comment_nb: int) -> Dict:
     """Get photo complete attributes."""
     trip = get_trip(trip_id=trip_id)
     if trip:
@@ -259,7 +309,6 @@ def get_photo_details(trip_id: str, photo_id: str, liked_users_sort_type: str,
                 return photo.get_photo_information(
                     photo_id=photo_id,
                     current_user_id=current_user.id,
-                    liked_users_sort_by=liked_users_sort_type,
                     liked_user_nb=liked_user_nb,
                     comments_sort_by=comments_sort_type,
                     comment_nb=comment_nb
@@ -496,7 +545,7 @@ def sign_up(email: str,
         avatar_url = DEFAULT_AVATAR_URL
     user = User.create_new_user(email=email, unique_name=user_unique_name, password=password, avatar_url=avatar_url)
 
-    if login_user(user):
+    if _log_in(user):
         payload = {
             "userToken": user.generate_auth_token(),
             "user": user.get_complete_attributes(follower_nb=0)
@@ -513,7 +562,7 @@ def sign_in(email: str, password: str) -> Dict:
         raise APIError404(f"User {email} is not found")
     except UserPasswordIncorrect:
         raise APIError401(f"User {email} failed to login")
-    if login_user(user):
+    if _log_in(user):
         return {
             "userToken": user.generate_auth_token(),
             "user": user.get_complete_attributes(follower_nb=6)
@@ -522,8 +571,10 @@ def sign_in(email: str, password: str) -> Dict:
         raise APIError500(f"User {email} failed to sign in")
 
 
-@user_token_required
-def sign_out():
+def sign_out(user_token: str):
+    verify_user_token(user_token)
+    # the token stays valid until it expires otherwise, whatever the authentication mode
+    revoke_auth_token(user_token)
     if current_user.is_anonymous:
         LOGGER.warning("Anonymous user doesn't need to log out")
     else:
@@ -573,23 +624,18 @@ def update_trip(trip_id: str, name: str, description: str, user_ids: List[str]):
         user_ids_to_update = new_user_ids & old_user_ids
         user_ids_to_delete = old_user_ids - new_user_ids
         attributes_to_update['users'] = new_user_ids
-        # update TripsByUser
-        for user_id in user_ids_to_add:
-            TripsByUser.create(
-                user_id=user_id,
-                create_time=trip.create_time,
-                trip_id=trip_id,
-                owner_id=trip.owner_id,
-                **attributes_to_update,
-            )
-        for user_id in user_ids_to_update:
-            TripsByUser.get(user_id=user_id, trip_id=trip_id, create_time=trip.create_time).update(
-                **attributes_to_update
-            )
-        for user_id in user_ids_to_delete:
-            TripsByUser.get(user_id=user_id, trip_id=trip_id, create_time=trip.create_time).delete()
+    else:
+        user_ids_to_add = user_ids_to_delete = set()
+        user_ids_to_update = trip.users
     # update Trip
     trip.update(**attributes_to_update)
+    # update TripsByUser, the records of the new users are written from the updated trip
+    write_trip_memberships(
+        trip=trip,
+        user_ids_to_add=user_ids_to_add,
+        user_ids_to_update=user_ids_to_update,
+        attributes_to_update=attributes_to_update,
+        user_ids_to_delete=user_ids_to_delete)
     return trip.get_complete_attributes(users_sort_type=SortType.CREATE_TIME.value, user_nb=None)
 
 
@@ -618,23 +664,13 @@ def search_users(query: str, users_sort_type: str = SearchSortType.BEST_MATCH.va
 def search_users_in_trip(trip_id: str, query: str, users_sort_type: str = SearchSortType.BEST_MATCH.value,
                          start_index: int = 0, nb: int = 12) -> List[Dict]:
     trip = Trip.get_trip_by_trip_id(trip_id=trip_id)
-    all_matched_users = _search_users(
-        query=query,
-        users_sort_type=users_sort_type,
+    return User.search_users(
+        name_query=query,
         start_index=start_index,
-        nb=nb
-    )
-    users_in_trip = trip.get_users(
-        users_sort_type=SortType.CREATE_TIME.value,
-        start_index=0,
-        user_nb=None
+        nb=nb,
+        sort_type=users_sort_type,
+        user_ids=trip.users
     )
-    user_ids_in_trip = set([user['id'] for user in users_in_trip])
-    matched_trip_users = []
-    for user in all_matched_users:
-        if user['id'] in user_ids_in_trip:
-            matched_trip_users.append(user)
-    return matched_trip_users
 
 
 @user_token_required
@@ -642,9 +678,10 @@ def upload_trip_photos(trip_id: str, original_photos: List[Dict]) -> Tuple[List[
     # 1. get trip obj from Cassandra DB
     # 2. for each photo:
     #   2.1. generate url
-    #   2.2. create photo obj in Cassandra DB
-    #   2.3. add it to the table photos_by_trip
-    # 3. use the first photo as the cover photo for the trip if it's not set yet
+    #   2.2. build the photo record
+    #   2.3. build its record of the table photos_by_trip
+    # 3. write all the records concurrently
+    # 4. use the first photo as the cover photo for the trip if it's not set yet
     LOGGER.info(f"Uploading photo for trip {trip_id}")
     trip = get_trip(trip_id=trip_id)
 
@@ -655,6 +692,8 @@ def upload_trip_photos(trip_id: str, original_photos: List[Dict]) -> Tuple[List[
         process_pool.close()
         process_pool.join()
 
+    reduced_photos = []
+    records = []
     for i, original_photo in enumerate(original_photos):
         size2url = size2urls[i]
         location = original_photo.get("location",
@@ -679,19 +718,25 @@ def upload_trip_photos(trip_id: str, original_photos: List[Dict]) -> Tuple[List[
             src=size2url[ImageSize.ORIGINAL.name],
             access_level=original_photo['accessLevel']
         )
-        Photo.create_from_reduced_photo(
+        reduced_photos.append(reduced_photo)
+        records.append(Photo.build_from_reduced_photo(
             reduced_photo=reduced_photo,
             high_quality_src=size2url[ImageSize.ORIGINAL.name],
             mentioned_users=original_photo.get("mentionedUserIds", set()),
-        )
-        PhotosByTrip.create_from_reduced_photo(reduced_photo=reduced_photo)
-        if trip.cover_photo is None:
-            try:
-                trip.update(cover_photo=reduced_photo)
-            except Exception as e:
-                LOGGER.exception(e)
-                raise APIError500(f"Failed to update the cover photo for the trip, trip_id={trip_id}")
-            LOGGER.info(f"Update the cover photo for the trip {trip_id} with the photo {reduced_photo.photo_id}")
+        ))
+        records.append(PhotosByTrip.build_from_reduced_photo(reduced_photo=reduced_photo))
+
+    # the photo ids were just generated, so the records are written without lightweight transactions
+    insert_models(records)
+
+    if trip.cover_photo is None and reduced_photos:
+        cover_photo = reduced_photos[0]
+        try:
+            trip.update(cover_photo=cover_photo)
+        except Exception as e:
+            LOGGER.exception(e)
+            raise APIError500(f"Failed to update the cover photo for the trip, trip_id={trip_id}")
+        LOGGER.info(f"Update the cover photo for the trip {trip_id} with the photo {cover_photo.photo_id}")
 
     return PhotosByTrip.get_filtered_photos(
         trip_id=trip_id,
@@ -713,19 +758,13 @@ def _update_photo(trip_id: str, photo_id: str, access_level: str, mentioned_user
         if location is not None:
             attributes_to_update['location'] = location
         if is_liked is not None:
-            # TODO: avoid a copy, it will waste memory usage
-            liked_users, liked_nb = photo.liked_users, photo.liked_nb
-            if is_liked and current_user.id not in liked_users:
-                liked_users.add(current_user.id)
-                liked_nb += 1
-            elif not is_liked and current_user.id in liked_users:
-                liked_users.remove(current_user.id)
-                liked_nb -= 1
-            attributes_to_update["liked_users"] = liked_users
-            attributes_to_update["liked_nb"] = liked_nb
-        photo.update(**attributes_to_update)
+            if is_liked and LikesByPhoto.like(photo_id=photo_id, user_id=current_user.id):
+                increment_counter(PhotoCounters, 'liked_nb', photo_id, delta=1)
+            elif not is_liked and LikesByPhoto.unlike(photo_id=photo_id, user_id=current_user.id):
+                increment_counter(PhotoCounters, 'liked_nb', photo_id, delta=-1)
+        if len(attributes_to_update.keys()) > 0:
+            photo.update(**attributes_to_update)
         attributes_to_update.pop('mentioned_users', None)
-        attributes_to_update.pop('liked_users', None)
         if len(attributes_to_update.keys()) > 0:
             photos_by_trip_record = PhotosByTrip.get(
                 trip_id=trip_id,
@@ -765,6 +804,7 @@ def update_trip_photos(trip_id: str, photo_ids: List[str], access_level: str):
                 )
             except PhotoNotFound as e:
                 raise APIError404(message=str(e))
+    User.prime_reduced_users(photo.owner for photo in updated_photos)
     return [photo.to_reduced_photo_dict() for photo in updated_photos]
 
 
@@ -11,6 +11,11 @@ class APIError(Exception, Error):
         return repr(self.message)
 
 
+class APIError400(APIError):
+    def __init__(self, message):
+        super().__init__(message=f"Bad Request: {message}", code=HTTPStatus.BAD_REQUEST.value)
+
+
 class APIError404(APIError):
     def __init__(self, message):
         super().__init__(message=message, code=HTTPStatus.NOT_FOUND.value)
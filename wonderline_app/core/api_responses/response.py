@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Dict
+from typing import Dict, List, Optional
 
 from wonderline_app.utils import convert_date_to_timestamp_in_expected_unit
 
@@ -30,11 +30,20 @@ class Feedback(CodeMessage):
         super().__init__(code, message)
 
 
+class Page:
+    """A page of items, along with the cursor of the next page (None when there are no more items)."""
+
+    def __init__(self, items: List, next_cursor: Optional[str] = None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+
 class Response:
     def __init__(self, payload: dict = None, errors=None, feedback=None):
         self.payload = payload if payload else {}
         self.errors = errors if errors else []
         self.feedbacks = feedback if feedback else []
+        self.next_cursor = None
         self.timestamp = None
 
     @property
@@ -51,12 +60,19 @@ class Response:
     def add_feedback(self, feedback: Feedback):
         self.feedbacks.append(feedback)
 
+    def set_page(self, page: Page):
+        self.payload = page.items
+        self.next_cursor = page.next_cursor
+
     def to_dict(self) -> Dict:
         if self.timestamp is None:
             self.timestamp = datetime.now().timestamp()
-        return {
+        res = {
             "payload": self.payload,
             "errors": [err.to_dict for err in self.errors],
             "feedbacks": [fb.to_dict for fb in self.feedbacks],
             "timestamp": self.timestamp
         }
+        if self.next_cursor is not None:
+            res["nextCursor"] = self.next_cursor
+        return res
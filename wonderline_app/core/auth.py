@@ -0,0 +1,197 @@
+"""
+User token signing and verification.
+
+Tokens are signed with the SECRET_KEY of the Flask config, which must be shared by every worker and node so that a
+token issued by one of them is accepted by all the others.
+
+The environment variable AUTH_MODE selects how the user of a request is identified:
+ - `session` (default): by the Flask-Login session cookie, the user token must belong to the same user.
+ - `token`: by the user token only, without any server or cookie session.
+
+Verified tokens are cached until they expire, following CACHE_BACKEND. Signed out tokens are revoked in the
+revoked_token table of PostgreSQL, shared by every worker and never evicted. The table is read through the caches of
+`RevokedTokenStore`: a token revoked by another worker is rejected after REVOKED_TOKEN_CHECK_INTERVAL seconds at worst,
+even when it is found in the cache of verified tokens.
+"""
+import hashlib
+import logging
+import os
+import time
+import uuid
+from enum import Enum
+
+from flask import current_app, g
+from itsdangerous import TimedJSONWebSignatureSerializer as Serializer
+from itsdangerous import SignatureExpired, BadSignature
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from wonderline_app.cache import create_cache
+from wonderline_app.cache.base import Cache
+from wonderline_app.cache.memory import LRUCache
+from wonderline_app.db.postgres.init import db_session
+from wonderline_app.db.postgres.exceptions import UserTokenInvalid, UserTokenExpired
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_EXPIRATION = 7200  # in seconds
+
+# token digest -> [user id, expire timestamp, token id]
+VERIFIED_TOKEN_CACHE = create_cache(
+    namespace='verified_tokens',
+    max_size=int(os.environ.get('VERIFIED_TOKEN_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('VERIFIED_TOKEN_CACHE_TTL', 600)))
+
+
+class RevokedTokenStore:
+    """
+    Ids of the revoked tokens, each one kept in the revoked_token table until the token expires.
+
+    The table is only read when both caches miss:
+     - `revoked_cache` holds the revoked ids as long as a token may live, it is filled on revocation and follows
+       CACHE_BACKEND, so that a revocation is seen at once by the workers sharing it.
+     - `unrevoked_cache` holds the ids found not revoked by this worker, for a few seconds only.
+    """
+    IS_REVOKED_QUERY = text("SELECT EXISTS (SELECT 1 FROM revoked_token WHERE jti = :jti)")
+    REVOKE_QUERY = text("INSERT INTO revoked_token (jti, expire_time) VALUES (:jti, to_timestamp(:expire_time)) "
+                        "ON CONFLICT (jti) DO NOTHING")
+    PURGE_QUERY = text("DELETE FROM revoked_token WHERE expire_time < now()")
+
+    def __init__(self, revoked_cache: Cache, unrevoked_cache: Cache):
+        self._revoked_cache = revoked_cache
+        self._unrevoked_cache = unrevoked_cache
+
+    def is_revoked(self, jti: str) -> bool:
+        """
+        :raise UserTokenInvalid when the revoked tokens can't be read, the token can't be trusted then
+        """
+        if self._unrevoked_cache.get(jti) is not None:
+            return False
+        if self._revoked_cache.get(jti) is not None:
+            return True
+        try:
+            is_revoked = self._is_revoked_in_db(jti)
+        except SQLAlchemyError as e:
+            db_session.rollback()
+            LOGGER.error(f"Failed to check whether the token {jti} is revoked: {e}")
+            raise UserTokenInvalid
+        (self._revoked_cache if is_revoked else self._unrevoked_cache).set(jti, True)
+        return is_revoked
+
+    def revoke(self, jti: str, expire_time: float):
+        self._revoke_in_db(jti, expire_time)
+        self._revoked_cache.set(jti, True)
+        self._unrevoked_cache.delete(jti)
+
+    def _is_revoked_in_db(self, jti: str) -> bool:
+        return bool(db_session.execute(self.IS_REVOKED_QUERY, {'jti': jti}).scalar())
+
+    def _revoke_in_db(self, jti: str, expire_time: float):
+        db_session.execute(self.REVOKE_QUERY, {'jti': jti, 'expire_time': expire_time})
+        # the tokens which have expired since can't be accepted anyway
+        db_session.execute(self.PURGE_QUERY)
+        db_session.commit()
+
+
+REVOKED_TOKENS = RevokedTokenStore(
+    revoked_cache=create_cache(
+        namespace='revoked_tokens',
+        max_size=int(os.environ.get('REVOKED_TOKEN_CACHE_SIZE', 10000)),
+        ttl=DEFAULT_TOKEN_EXPIRATION),
+    unrevoked_cache=LRUCache(
+        namespace='unrevoked_tokens',
+        max_size=int(os.environ.get('VERIFIED_TOKEN_CACHE_SIZE', 10000)),
+        ttl=float(os.environ.get('REVOKED_TOKEN_CHECK_INTERVAL', 5))))
+
+
+class AuthMode(Enum):
+    SESSION = 'session'
+    TOKEN = 'token'
+
+
+def get_auth_mode() -> AuthMode:
+    return AuthMode(os.environ.get('AUTH_MODE', AuthMode.SESSION.value))
+
+
+def generate_auth_token(user_id: str, expiration: int = DEFAULT_TOKEN_EXPIRATION) -> str:
+    s = Serializer(current_app.config['SECRET_KEY'], expires_in=expiration)
+    # the token id makes every token unique, so that revoking one never rejects a token issued in the same second
+    return s.dumps({'id': user_id, 'jti': uuid.uuid4().hex}).decode("ascii")
+
+
+def _get_token_digest(token: str) -> str:
+    # tokens are credentials, only their digests are stored in the caches
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _verify_auth_token(token: str):
+    """Check the signature of the token, and get the user id with the expire timestamp and the token id."""
+    s = Serializer(current_app.config['SECRET_KEY'])
+    try:
+        data, header = s.loads(token, return_header=True)
+    except SignatureExpired as e:
+        LOGGER.exception(e)
+        raise UserTokenExpired
+    except BadSignature as e:
+        LOGGER.exception(e)
+        raise UserTokenInvalid
+    if not isinstance(data, dict) or 'id' not in data:
+        raise UserTokenInvalid
+    # the tokens issued without id are identified by their digest
+    return data['id'], header['exp'], data.get('jti', _get_token_digest(token))
+
+
+def decode_auth_token(token: str) -> str:
+    """
+    Get the id of the user the token was issued to.
+
+    :raise UserTokenExpired, UserTokenInvalid
+    """
+    user_id, expire_time, jti = _get_verified_token(token)
+    if REVOKED_TOKENS.is_revoked(jti):
+        raise UserTokenInvalid
+    return user_id
+
+
+def decode_request_auth_token(token: str) -> str:
+    """
+    Same as `decode_auth_token`, the outcome is kept in the app context so that the token is only decoded once per
+    request, by the Flask-Login request loader and then by the verification of the endpoint.
+
+    :raise UserTokenExpired, UserTokenInvalid
+    """
+    decoded_token = g.get('decoded_auth_token')
+    if decoded_token is None or decoded_token[0] != token:
+        try:
+            decoded_token = (token, decode_auth_token(token), None)
+        except (UserTokenInvalid, UserTokenExpired) as e:
+            decoded_token = (token, None, e)
+        g.decoded_auth_token = decoded_token
+    _, user_id, error = decoded_token
+    if error is not None:
+        raise error
+    return user_id
+
+
+def _get_verified_token(token: str):
+    """Same as `_verify_auth_token`, with the cache of verified tokens."""
+    digest = _get_token_digest(token)
+    verified_token = VERIFIED_TOKEN_CACHE.get(digest)
+    if verified_token is None:
+        verified_token = _verify_auth_token(token)
+        VERIFIED_TOKEN_CACHE.set(digest, list(verified_token))
+    user_id, expire_time, jti = verified_token
+    if expire_time <= time.time():
+        VERIFIED_TOKEN_CACHE.delete(digest)
+        raise UserTokenExpired
+    return user_id, expire_time, jti
+
+
+def revoke_auth_token(token: str):
+    """
+    Reject the token from now on on every worker, even though its signature is still valid.
+
+    :raise UserTokenExpired, UserTokenInvalid
+    """
+    _, expire_time, jti = _get_verified_token(token)
+    REVOKED_TOKENS.revoke(jti, expire_time)
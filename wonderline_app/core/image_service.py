@@ -2,18 +2,21 @@ import base64
 import datetime
 import logging
 import os
+from concurrent.futures import Future, ThreadPoolExecutor
 from enum import Enum
-from typing import Dict, Union, List
+from typing import Dict, Iterable, Union, List
 
 from werkzeug.utils import secure_filename
 from PIL import Image
 
 from wonderline_app.db.minio.base import put_object_in_minio_and_return_url, object_exists_in_minio, \
-    remove_object_from_minio
+    remove_object_from_minio, remove_objects_from_minio
 from wonderline_app.utils import get_uuid
 
 LOGGER = logging.getLogger(__name__)
 DEFAULT_AVATAR_URL = "http://localhost/photos/default_avatar.png"
+# a single worker removes the images of the deleted photos, one bulk removal after the other
+_IMAGE_REMOVAL_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-removal')
 
 
 class ImageTypeNotRecognized(Exception):
@@ -172,7 +175,30 @@ def upload_default_avatar_if_possible():
         )
 
 
+def _get_object_name_by_url(url: str, bucket_name: str) -> str:
+    return url.split(bucket_name)[1].lstrip('/')
+
+
 def remove_image_by_url(url: str):
     photos_bucket_name = os.environ['MINIO_PHOTOS_BUCKET_NAME']
-    object_name = url.split(photos_bucket_name)[1]
+    object_name = _get_object_name_by_url(url, photos_bucket_name)
     remove_object_from_minio(bucket_name=photos_bucket_name, object_name=object_name)
+
+
+def remove_images_by_urls(urls: Iterable[str]):
+    photos_bucket_name = os.environ['MINIO_PHOTOS_BUCKET_NAME']
+    remove_objects_from_minio(
+        bucket_name=photos_bucket_name,
+        object_names=[_get_object_name_by_url(url, photos_bucket_name) for url in urls if url])
+
+
+def _log_removal_failure(future: Future):
+    if future.exception() is not None:
+        LOGGER.error("Failed to remove images from minio", exc_info=future.exception())
+
+
+def remove_images_by_urls_in_background(urls: Iterable[str]) -> Future:
+    """Remove the images on the background worker, so that the request doesn't wait for Minio."""
+    future = _IMAGE_REMOVAL_EXECUTOR.submit(remove_images_by_urls, list(urls))
+    future.add_done_callback(_log_removal_failure)
+    return future
@@ -0,0 +1,234 @@
+"""
+In-memory n-gram index of user names, used to answer user autocomplete queries without PostgreSQL.
+"""
+import bisect
+import heapq
+import logging
+import os
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from wonderline_app.utils import edit_distances
+
+LOGGER = logging.getLogger(__name__)
+
+
+class UserSearchIndex:
+    """
+    Inverted index from the 1, 2 and 3-grams of users' nick names and unique names to user ids, with the sorted
+    array of the words starting in the names (prefix array).
+
+    Users whose names start with the query are ranked first, then users with a word starting with the query, then
+    users whose names contain the query, and finally users whose names share enough trigrams with the query (fuzzy
+    matches). Within each group, users are ranked by edit distance.
+
+    Queries of up to 3 characters match too many users to rank all of them: only the first SHORT_QUERY_CANDIDATE_NB
+    users with a word starting with the query (in the order of the prefix array), completed by users whose names
+    contain it, are ranked. Queries shorter than MIN_QUERY_LENGTH are not served by the index (see can_search).
+    """
+    MAX_GRAM_SIZE = 3
+    MIN_QUERY_LENGTH = 2
+    SHORT_QUERY_CANDIDATE_NB = 200
+
+    def __init__(self, fuzzy_threshold: float = 0.3):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.is_ready = False
+        self._users: Dict[str, Dict] = {}  # user id -> reduced user
+        self._terms: Dict[str, Tuple[str, ...]] = {}  # user id -> normalized names
+        self._postings: Dict[str, Set[str]] = defaultdict(set)  # n-gram -> user ids
+        self._prefixes: List[Tuple[str, str]] = []  # sorted (name from the start of one of its words, user id)
+        # updates received while the index is rebuilt, user id -> reduced user (None when removed)
+        self._pending_updates: Optional[Dict[str, Optional[Dict]]] = None
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _normalize(name: Optional[str]) -> str:
+        return (name or '').strip().lower()
+
+    @staticmethod
+    def _split_words(term: str) -> List[str]:
+        return term.replace('_', ' ').split()
+
+    @classmethod
+    def _get_grams(cls, term: str, size: int) -> Set[str]:
+        return {term[i:i + size] for i in range(len(term) - size + 1)}
+
+    @classmethod
+    def _get_all_grams(cls, terms: Iterable[str]) -> Set[str]:
+        grams = set()
+        for term in terms:
+            for size in range(1, cls.MAX_GRAM_SIZE + 1):
+                grams |= cls._get_grams(term, size)
+        return grams
+
+    @classmethod
+    def _get_word_suffixes(cls, terms: Iterable[str]) -> Set[str]:
+        """Get the names from the start of each of their words, e.g. "jon snow" -> "jon snow", "snow"."""
+        suffixes = set()
+        for term in terms:
+            for i, char in enumerate(term):
+                if char not in ' _' and (i == 0 or term[i - 1] in ' _'):
+                    suffixes.add(term[i:])
+        return suffixes
+
+    @property
+    def accepts_updates(self) -> bool:
+        """Whether the index is built or being built, in which case the user updates must be applied to it."""
+        return self.is_ready or self._pending_updates is not None
+
+    def can_search(self, name_query: Optional[str]) -> bool:
+        return self.is_ready and len(self._normalize(name_query)) >= self.MIN_QUERY_LENGTH
+
+    def build(self, reduced_users: Iterable[Dict]):
+        """
+        Replace the content of the index and mark it as ready, searches are served by the old content meanwhile.
+
+        The users added or removed during the build are recorded, and applied again to the new content, so that they
+        are not lost until the next build.
+        """
+        with self._lock:
+            self._pending_updates = {}
+        try:
+            new_index = UserSearchIndex(fuzzy_threshold=self.fuzzy_threshold)
+            for reduced_user in reduced_users:
+                new_index._add(reduced_user, keep_sorted=False)
+            new_index._prefixes.sort()
+            with self._lock:
+                for user_id, reduced_user in self._pending_updates.items():
+                    if reduced_user is None:
+                        new_index.remove(user_id)
+                    else:
+                        new_index.add(reduced_user)
+                self._users = new_index._users
+                self._terms = new_index._terms
+                self._postings = new_index._postings
+                self._prefixes = new_index._prefixes
+                self.is_ready = True
+        finally:
+            with self._lock:
+                self._pending_updates = None
+        LOGGER.info(f"User search index built with {len(self._users)} users")
+
+    def add(self, reduced_user: Dict):
+        """Add the user to the index, or update it when it's already indexed."""
+        with self._lock:
+            self._add(reduced_user, keep_sorted=True)
+            if self._pending_updates is not None:
+                self._pending_updates[reduced_user['id']] = dict(reduced_user)
+
+    def _add(self, reduced_user: Dict, keep_sorted: bool):
+        user_id = reduced_user['id']
+        terms = tuple(t for t in {self._normalize(reduced_user['nickName']),
+                                  self._normalize(reduced_user['uniqueName'])} if t)
+        self._remove(user_id)
+        self._users[user_id] = dict(reduced_user)
+        self._terms[user_id] = terms
+        for gram in self._get_all_grams(terms):
+            self._postings[gram].add(user_id)
+        for suffix in self._get_word_suffixes(terms):
+            if keep_sorted:
+                bisect.insort(self._prefixes, (suffix, user_id))
+            else:
+                self._prefixes.append((suffix, user_id))
+
+    def remove(self, user_id: str):
+        with self._lock:
+            self._remove(user_id)
+            if self._pending_updates is not None:
+                self._pending_updates[user_id] = None
+
+    def _remove(self, user_id: str):
+        terms = self._terms.pop(user_id, None)
+        self._users.pop(user_id, None)
+        if terms is None:
+            return
+        for gram in self._get_all_grams(terms):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(user_id)
+                if not postings:
+                    del self._postings[gram]
+        for suffix in self._get_word_suffixes(terms):
+            i = bisect.bisect_left(self._prefixes, (suffix, user_id))
+            if i < len(self._prefixes) and self._prefixes[i] == (suffix, user_id):
+                del self._prefixes[i]
+
+    def _get_prefix_matches(self, query: str, nb: int) -> Dict[str, bool]:
+        """Get the first nb user ids having a word starting with the query."""
+        candidates = {}
+        i = bisect.bisect_left(self._prefixes, (query,))
+        while i < len(self._prefixes) and len(candidates) < nb and self._prefixes[i][0].startswith(query):
+            candidates[self._prefixes[i][1]] = True
+            i += 1
+        return candidates
+
+    def _get_candidates(self, query: str) -> Dict[str, bool]:
+        """Get the candidate user ids, mapped to whether one of their names contains the query."""
+        if len(query) <= self.MAX_GRAM_SIZE:
+            candidates = self._get_prefix_matches(query, nb=self.SHORT_QUERY_CANDIDATE_NB)
+            for user_id in self._postings.get(query, ()):
+                if len(candidates) >= self.SHORT_QUERY_CANDIDATE_NB:
+                    break
+                candidates[user_id] = True
+            return candidates
+        query_grams = self._get_grams(query, self.MAX_GRAM_SIZE)
+        overlaps = Counter()
+        for gram in query_grams:
+            overlaps.update(self._postings.get(gram, ()))
+        candidates = {}
+        for user_id, overlap in overlaps.items():
+            is_substring = any(query in term for term in self._terms[user_id])
+            if is_substring or overlap / len(query_grams) >= self.fuzzy_threshold:
+                candidates[user_id] = is_substring
+        return candidates
+
+    def _get_candidates_among(self, query: str, user_ids: Iterable[str]) -> Dict[str, bool]:
+        """Same as _get_candidates among the given user ids only, e.g. the users of a trip."""
+        query_grams = self._get_grams(query, self.MAX_GRAM_SIZE)
+        candidates = {}
+        for user_id in set(user_ids):
+            terms = self._terms.get(user_id)
+            if not terms:
+                continue
+            is_substring = any(query in term for term in terms)
+            if is_substring:
+                candidates[user_id] = True
+            elif len(query) > self.MAX_GRAM_SIZE:
+                overlap = len(query_grams & self._get_all_grams(terms))
+                if overlap / len(query_grams) >= self.fuzzy_threshold:
+                    candidates[user_id] = False
+        return candidates
+
+    def search(self, name_query: str, start_index: int = 0, nb: int = 12,
+               user_ids: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        Get a page of the best matching reduced users, optionally restricted to the given user ids.
+
+        Queries shorter than MIN_QUERY_LENGTH don't match anyone, see can_search.
+        """
+        query = self._normalize(name_query)
+        if len(query) < self.MIN_QUERY_LENGTH or nb <= 0:
+            return []
+        with self._lock:
+            if user_ids is not None:
+                candidates = self._get_candidates_among(query, user_ids)
+            else:
+                candidates = self._get_candidates(query)
+
+            def rank(user_id: str):
+                terms = self._terms[user_id]
+                is_prefix = any(term.startswith(query) for term in terms)
+                is_word_prefix = any(word.startswith(query) for term in terms for word in self._split_words(term))
+                distance = min(edit_distances(query, terms))
+                return not is_prefix, not is_word_prefix, not candidates[user_id], distance, user_id
+
+            best_user_ids = heapq.nsmallest(start_index + nb, candidates, key=rank)[start_index:]
+            return [dict(self._users[user_id]) for user_id in best_user_ids]
+
+
+USER_SEARCH_INDEX = UserSearchIndex()
+
+
+def is_user_search_index_enabled() -> bool:
+    return os.environ.get('USER_SEARCH_INDEX_ENABLED', 'false').lower() == 'true'
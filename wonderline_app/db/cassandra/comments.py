@@ -12,7 +12,10 @@ from cassandra.cqlengine.usertype import UserType
 
 from wonderline_app.db.postgres.models import User
 from wonderline_app.api.common.enums import SortType
+from wonderline_app.db.cassandra.counters import PhotoCounters, CommentCounters, ReplyCounters, get_counter, \
+    increment_counter, prime_counters, delete_counters
 from wonderline_app.db.cassandra.exceptions import CommentNotFound, ReplyNotFound
+from wonderline_app.db.cassandra.statements import get_model_by_primary_key
 from wonderline_app.db.cassandra.utils import get_filtered_models, SORTING_MAPPING
 from wonderline_app.utils import convert_date_to_timestamp_in_expected_unit, get_uuid, get_current_timestamp
 
@@ -39,7 +42,6 @@ class Reply(UserType):
             "user": User.get_user_attributes_or_none(user_id=self.user, reduced=True),
             "createTime": convert_date_to_timestamp_in_expected_unit(self.create_time),
             "content": self.content,
-            "likedNb": self.liked_nb,
             "hashtags": self.entities.hashtags,
             "mentions": self.entities.mentions,
             "hasLiked": self.entities.hasLiked,
@@ -111,18 +113,21 @@ class MentionedUser(UserType):
 class ReplyWithId:
     reply_id: str
     _reply: Reply
+    comment_id: Optional[str] = None
 
     def to_dict(self):
         return {
             "id": self.reply_id,
-            **self._reply.to_dict()
+            **self._reply.to_dict(),
+            "likedNb": self.liked_nb,
         }
 
     @classmethod
-    def create(cls, content: str, user_id: str):
+    def create(cls, content: str, user_id: str, comment_id: str):
         return cls(
             reply_id=get_uuid(),
-            _reply=Reply.create(content, user_id)
+            _reply=Reply.create(content, user_id),
+            comment_id=comment_id
         )
 
     def __getattr__(self, item):
@@ -140,6 +145,10 @@ class ReplyWithId:
     def reply_value(self):
         return self._reply
 
+    @property
+    def liked_nb(self) -> int:
+        return get_counter(ReplyCounters, 'liked_nb', self.comment_id, self.reply_id)
+
 
 class CommentsByPhoto(Model):
     __table_name__ = "comments_by_photo"
@@ -149,6 +158,7 @@ class CommentsByPhoto(Model):
     comment_id = columns.Text(primary_key=True)
     user = columns.Text()
     content = columns.Text()
+    # no longer maintained, the tallies of the comments and their replies are counters (see CommentCounters)
     liked_nb = columns.SmallInt(default=0)
     reply_nb = columns.SmallInt(default=0)
     replies = columns.Map(columns.Text, UserDefinedType(Reply))
@@ -161,8 +171,8 @@ class CommentsByPhoto(Model):
             "createTime": convert_date_to_timestamp_in_expected_unit(self.create_time),
             "user": User.get_user_attributes_or_none(user_id=self.user, reduced=True),
             "content": self.content,
-            "likedNb": self.liked_nb,
-            "replyNb": self.reply_nb,
+            "likedNb": get_counter(CommentCounters, 'liked_nb', self.comment_id),
+            "replyNb": get_counter(CommentCounters, 'reply_nb', self.comment_id),
             # TODO: self.replies is List[ReplyWithId], ambiguity !
             "replies": [reply.to_dict() for reply in self.replies],
             "hashtags": self.entities.hashtags,
@@ -173,6 +183,7 @@ class CommentsByPhoto(Model):
     def get_filtered_replies_objects(self, sort_by: str = "createTime", nb: int = 6,
                                      start_index: int = 0) -> List[ReplyWithId]:
         return CommentUtils.get_filtered_replies_objects(
+            comment_id=self.comment_id,  # type: ignore
             replies=self.replies,  # type: ignore
             sort_by=sort_by,
             start_index=start_index,
@@ -209,8 +220,11 @@ class CommentsByPhoto(Model):
         except DoesNotExist:
             raise CommentNotFound(f"Comments with photo_id {photo_id} is not found")
         else:
-            comments.sort(
-                key=lambda x: (-x.liked_nb, -x.reply_nb, -convert_date_to_timestamp_in_expected_unit(x.create_time)))
+            prime_counters(CommentCounters, [(comment.comment_id,) for comment in comments])
+            comments.sort(key=lambda x: (
+                -get_counter(CommentCounters, 'liked_nb', x.comment_id),
+                -get_counter(CommentCounters, 'reply_nb', x.comment_id),
+                -convert_date_to_timestamp_in_expected_unit(x.create_time)))
             comments = comments[start_index: start_index + nb]
             for comment in comments:
                 comment.replies = comment.get_replies_objects(
@@ -227,6 +241,7 @@ class CommentsByPhoto(Model):
                         comment_id=str(reply.reply_id),
                         current_user_id=current_user_id
                     )
+            User.prime_reduced_users(CommentUtils.get_user_ids(comments))
         return comments
 
     @classmethod
@@ -253,17 +268,8 @@ class CommentsByPhoto(Model):
 
     @classmethod
     def add_reply(cls, photo_id: str, comment_id: str, reply: ReplyWithId):
-        comment_to_update: CommentsByPhoto = cls.get(
-            photo_id=photo_id,
-            comment_id=comment_id,
-        )
-        comment_to_update.reply_nb += 1
-        comment_to_update.replies[reply.reply_id] = reply.reply_value  # type: ignore
-        comment_to_update.update()
-
-    def update_comment(self, is_like: bool):
-        self.liked_nb += 1 if is_like else -1
-        self.update()
+        cls.objects(photo_id=photo_id, comment_id=comment_id).update(
+            replies__update={reply.reply_id: reply.reply_value})
 
 
 class Comment(Model):
@@ -285,8 +291,8 @@ class Comment(Model):
             "createTime": convert_date_to_timestamp_in_expected_unit(self.create_time),
             "user": User.get_user_attributes_or_none(user_id=self.user, reduced=True),
             "content": self.content,
-            "likedNb": self.liked_nb,
-            "replyNb": self.reply_nb,
+            "likedNb": get_counter(CommentCounters, 'liked_nb', self.comment_id),
+            "replyNb": get_counter(CommentCounters, 'reply_nb', self.comment_id),
             # TODO: self.replies is List[ReplyWithId], ambiguity !
             "replies": [reply.to_dict() for reply in self.replies],
             "hashtags": self.entities.hashtags,
@@ -297,6 +303,7 @@ class Comment(Model):
     def get_filtered_replies_objects(self, sort_by: str = "createTime", nb: int = 6,
                                      start_index: int = 0) -> List[ReplyWithId]:
         return CommentUtils.get_filtered_replies_objects(
+            comment_id=self.comment_id,  # type: ignore
             replies=self.replies,  # type: ignore
             sort_by=sort_by,
             start_index=start_index,
@@ -316,6 +323,7 @@ class Comment(Model):
                 comment_id=str(reply.reply_id),
                 current_user_id=current_user_id
             )
+        User.prime_reduced_users(reply.reply_value.user for reply in replies)
         return replies
 
     def get_replies(
@@ -339,18 +347,18 @@ class Comment(Model):
             comment_id=str(self.comment_id),
             current_user_id=current_user_id
         )
+        User.prime_reduced_users([self.user])
         return self.to_dict()
 
     @classmethod
     def get_comment(cls, comment_id: str) -> 'Comment':
         try:
-            return cls.get(comment_id=comment_id)
+            return get_model_by_primary_key(cls, comment_id)
         except DoesNotExist:
             raise CommentNotFound(f"Comment {comment_id} is not found")
 
     def add_reply(self, reply: ReplyWithId):
         self.replies[reply.reply_id] = reply.reply_value  # type: ignore
-        self.reply_nb += 1
         self.update()
 
     def update_comment(self, photo_id: str, is_like: bool, current_user_id: str):
@@ -364,16 +372,20 @@ class Comment(Model):
             entities_model.likes.add(current_user_id)  # type: ignore
         else:
             entities_model.likes.remove(current_user_id)  # type: ignore
-        self.liked_nb += 1 if is_like else -1
-        self.update()
         entities_model.update()
-        CommentsByPhoto.get(
-            photo_id=photo_id,
-            comment_id=self.comment_id
-        ).update_comment(is_like=is_like)
+        increment_counter(CommentCounters, 'liked_nb', self.comment_id, delta=1 if is_like else -1)
 
 
 class CommentUtils:
+    @classmethod
+    def get_user_ids(cls, comments: List) -> Set[str]:
+        """Get the ids of the users who wrote the comments or their (already filtered) replies."""
+        user_ids = set()
+        for comment in comments:
+            user_ids.add(comment.user)
+            user_ids.update(reply.reply_value.user for reply in comment.replies)
+        return user_ids
+
     @classmethod
     def add_reply(cls, photo_id: str, comment: Comment, reply_payload: Dict, user_id) -> ReplyWithId:
         content, hashtags, mentions = reply_payload["content"], reply_payload["hashtags"], reply_payload["mentions"]
@@ -381,7 +393,7 @@ class CommentUtils:
         hashtags = [Hashtag.from_dict(h) for h in hashtags]
         mentioned_users = [MentionedUser.from_dict(m) for m in mentions]
         # create reply
-        new_reply_record = ReplyWithId.create(content=content, user_id=user_id)
+        new_reply_record = ReplyWithId.create(content=content, user_id=user_id, comment_id=comment.comment_id)
         EntitiesByComment.create_one_record(
             comment_id=new_reply_record.reply_id,  # type: ignore
             hashtags=hashtags,
@@ -395,6 +407,7 @@ class CommentUtils:
             comment_id=comment.comment_id,  # type: ignore
             reply=new_reply_record
         )
+        increment_counter(CommentCounters, 'reply_nb', comment.comment_id)
         return new_reply_record
 
     @classmethod
@@ -425,16 +438,23 @@ class CommentUtils:
             user=user_id,
             content=content,
         )
+        increment_counter(PhotoCounters, 'comment_nb', photo_id)
         return new_comment_record
 
     @classmethod
-    def get_filtered_replies_objects(cls, replies: columns.Map(columns.Text, UserDefinedType(Reply)),
+    def get_filtered_replies_objects(cls, comment_id: str, replies: columns.Map(columns.Text, UserDefinedType(Reply)),
                                      sort_by: str = "createTime", nb: int = 6,
                                      start_index: int = 0) -> List[ReplyWithId]:
         sort_by = SORTING_MAPPING[sort_by]
-        return [ReplyWithId(id_, reply) for id_, reply in sorted(
-            replies.items(), key=lambda x: getattr(replies[x[0]], sort_by), reverse=True)][  # type: ignore
-               start_index: start_index + nb]
+        replies_with_ids = [ReplyWithId(id_, reply, comment_id) for id_, reply in replies.items()]  # type: ignore
+        if sort_by == 'liked_nb':
+            prime_counters(ReplyCounters, [(comment_id, reply.reply_id) for reply in replies_with_ids])
+            replies_with_ids.sort(key=lambda x: x.liked_nb, reverse=True)
+        else:
+            replies_with_ids.sort(key=lambda x: getattr(x.reply_value, sort_by), reverse=True)
+        replies_with_ids = replies_with_ids[start_index: start_index + nb]
+        prime_counters(ReplyCounters, [(comment_id, reply.reply_id) for reply in replies_with_ids])
+        return replies_with_ids
 
     @classmethod
     def delete_db_reply(cls, photo_id: str, comment_id: str, reply_id: str):
@@ -444,7 +464,6 @@ class CommentUtils:
         if reply_id not in comment.replies:
             raise ReplyNotFound(f"Reply {reply_id} is not found")
         comment.replies[reply_id] = None
-        comment.reply_nb -= 1
         comment.update()
         # remove in CommentsByPhoto
         comment_in_comments_by_photo = CommentsByPhoto.get(
@@ -452,8 +471,9 @@ class CommentUtils:
             comment_id=comment_id,
         )
         comment_in_comments_by_photo.replies[reply_id] = None
-        comment_in_comments_by_photo.reply_nb -= 1
         comment_in_comments_by_photo.update()
+        increment_counter(CommentCounters, 'reply_nb', comment_id, delta=-1)
+        delete_counters(ReplyCounters, comment_id, reply_id)
         # remove in EntitiesByComment
         EntitiesByComment.get(comment_id=reply_id).delete()
 
@@ -466,6 +486,10 @@ class CommentUtils:
             comment_id=comment_id
         ).delete()
         EntitiesByComment.get(comment_id=comment_id).delete()
+        increment_counter(PhotoCounters, 'comment_nb', photo_id, delta=-1)
+        delete_counters(CommentCounters, comment_id)
+        # the counters of all the replies of the comment
+        delete_counters(ReplyCounters, comment_id)
 
     @classmethod
     def update_reply(cls, photo_id: str, comment_id: str, reply_id: str, is_like: bool,
@@ -479,16 +503,8 @@ class CommentUtils:
             else:
                 entities.likes.remove(current_user_id)
             entities.update()
-
-            like_delta = 1 if is_like else -1
-
-            comment.replies[reply_id].liked_nb += like_delta
-            comment.update()
-
-            comment = CommentsByPhoto.get(photo_id=photo_id, comment_id=comment_id)
-            comment.replies[reply_id].liked_nb += like_delta
-            comment.update()
-        reply_with_id = ReplyWithId(reply_id=reply_id, _reply=comment.replies[reply_id])
+            increment_counter(ReplyCounters, 'liked_nb', comment_id, reply_id, delta=1 if is_like else -1)
+        reply_with_id = ReplyWithId(reply_id=reply_id, _reply=comment.replies[reply_id], comment_id=comment_id)
         reply_with_id.entities = EntitiesByComment.get_entities(
             current_user_id=current_user_id,
             entities_model=entities
@@ -0,0 +1,85 @@
+"""
+Counter tables of the likes, comments and replies tallies.
+
+The tallies are blind increments of Cassandra counters: they are neither read before being updated nor limited to
+a SmallInt. Their current values are merged into the responses at serialization with request-scoped batch loaders,
+primed like the reduced users.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from cassandra.cqlengine import columns
+from cassandra.cqlengine.models import Model
+
+from wonderline_app.db.loaders import BatchLoader, get_request_loader
+from wonderline_app.db.cassandra.statements import PREPARED_STATEMENTS, get_models_by_primary_keys, \
+    get_delete_statement
+
+
+class PhotoCounters(Model):
+    __table_name__ = "photo_counters"
+
+    photo_id = columns.Text(primary_key=True)
+    liked_nb = columns.Counter()
+    comment_nb = columns.Counter()
+
+
+class CommentCounters(Model):
+    __table_name__ = "comment_counters"
+
+    comment_id = columns.Text(primary_key=True)
+    liked_nb = columns.Counter()
+    reply_nb = columns.Counter()
+
+
+class ReplyCounters(Model):
+    __table_name__ = "reply_counters"
+
+    comment_id = columns.Text(primary_key=True)
+    reply_id = columns.Text(primary_key=True)
+    liked_nb = columns.Counter()
+
+
+def get_increment_counter_cql(cls: Type[Model], column_name: str) -> str:
+    db_field = cls._columns[column_name].db_field_name
+    conditions = ' AND '.join(f'"{column.db_field_name}" = ?' for column in cls._primary_keys.values())
+    return f'UPDATE {cls.column_family_name()} SET "{db_field}" = "{db_field}" + ? WHERE {conditions}'
+
+
+def _get_counters_by_primary_keys(cls: Type[Model], primary_key_values_list: List[Tuple]) -> Dict[Tuple, Model]:
+    counters = get_models_by_primary_keys(cls, primary_key_values_list)
+    return {key: counter for key, counter in zip(primary_key_values_list, counters) if counter is not None}
+
+
+def get_counter_loader(cls: Type[Model]) -> BatchLoader:
+    return get_request_loader(
+        name=f'counters_{cls.__table_name__}',
+        batch_load_fn=lambda keys: _get_counters_by_primary_keys(cls, keys))
+
+
+def prime_counters(cls: Type[Model], primary_key_values_list: Iterable[Sequence]):
+    """Declare the counters which will be serialized, so that they are read together."""
+    get_counter_loader(cls).prime(tuple(primary_key_values) for primary_key_values in primary_key_values_list)
+
+
+def get_counter(cls: Type[Model], column_name: str, *primary_key_values) -> int:
+    """Get the value of a counter, 0 when it has never been incremented."""
+    counters: Optional[Model] = get_counter_loader(cls).load(tuple(primary_key_values))
+    if counters is None:
+        return 0
+    return getattr(counters, column_name) or 0
+
+
+def increment_counter(cls: Type[Model], column_name: str, *primary_key_values, delta: int = 1):
+    """Add delta (possibly negative) to a counter without reading it."""
+    PREPARED_STATEMENTS.execute(get_increment_counter_cql(cls, column_name), [delta, *primary_key_values])
+    get_counter_loader(cls).clear(tuple(primary_key_values))
+
+
+def delete_counters(cls: Type[Model], *primary_key_values):
+    """
+    Delete the counters of a deleted entity, so that they aren't inherited by an entity with the same id,
+    or every counter of a partition given only its partition key.
+    """
+    PREPARED_STATEMENTS.execute(*get_delete_statement(cls, primary_key_values))
+    if len(primary_key_values) == len(cls._primary_keys):
+        get_counter_loader(cls).clear(tuple(primary_key_values))
@@ -6,7 +6,7 @@ from __future__ import annotations
 import logging
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Iterable, List, Dict, Optional, Tuple
 from cassandra.cqlengine import columns
 from cassandra.cqlengine.columns import UserDefinedType
 from cassandra.cqlengine.models import Model
@@ -15,16 +15,23 @@ from cassandra.cqlengine.usertype import UserType
 from cassandra.cqlengine.query import LWTException
 
 from wonderline_app.api.common.enums import SortType, AccessLevel, TripStatus
-from wonderline_app.core.image_service import remove_image_by_url
-from wonderline_app.db.cassandra.comments import CommentsByPhoto
-from wonderline_app.db.cassandra.utils import get_filtered_models
+from wonderline_app.core.image_service import remove_images_by_urls, remove_images_by_urls_in_background
+from wonderline_app.db.cassandra.comments import CommentsByPhoto, Comment, EntitiesByComment
+from wonderline_app.db.cassandra.counters import PhotoCounters, CommentCounters, ReplyCounters, get_counter, \
+    prime_counters, get_increment_counter_cql
+from wonderline_app.db.cassandra.statements import PREPARED_STATEMENTS, get_model_by_primary_key, \
+    get_select_by_primary_key_cql, get_select_partition_cql, get_models_by_primary_keys, get_insert_statement, \
+    get_update_statement, get_delete_statement, get_models_by_partition_keys
+from wonderline_app.db.cassandra.utils import get_filtered_models_page
 from wonderline_app.db.cassandra.exceptions import PhotoNotFound, TripNotFound
-from wonderline_app.db.postgres.exceptions import UserNotFound
 from wonderline_app.db.postgres.models import User
 from wonderline_app.utils import convert_date_to_timestamp_in_expected_unit, get_current_timestamp, get_uuid
 
 LOGGER = logging.getLogger(__name__)
 
+# number of users returned with each trip of a user
+TRIP_PREVIEW_USER_NB = 6
+
 
 @dataclass
 class ReducedTrip:
@@ -75,7 +82,7 @@ class ReducedPhoto(UserType):
             "height": self.height,
             "lqSrc": self.low_quality_src,
             "src": self.src,
-            "likedNb": self.liked_nb
+            "likedNb": get_counter(PhotoCounters, 'liked_nb', self.photo_id)
         }
 
     def __hash__(self):
@@ -114,15 +121,9 @@ class TripUtils:
 
 class PhotoUtils:
     @classmethod
-    def create_from_reduced_photo(cls, reduced_photo: ReducedPhoto, **kwargs):
-        try:
-            return cls.if_not_exists().create(
-                **{k: getattr(reduced_photo, k) for k in reduced_photo.keys()},
-                **kwargs)
-        except LWTException as exp:
-            LOGGER.warning(f"Failed to create new record from reduced photo, photo_id={reduced_photo.photo_id}")
-            LOGGER.warning(f"{exp.existing}")
-            raise Exception(f"Failed to create a new record for the class {cls.__name__}")
+    def build_from_reduced_photo(cls, reduced_photo: ReducedPhoto, **kwargs):
+        """Build a record from the reduced photo without saving it, see insert_models."""
+        return cls(**{k: getattr(reduced_photo, k) for k in reduced_photo.keys()}, **kwargs)
 
 
 class Photo(Model, PhotoUtils):
@@ -141,22 +142,24 @@ class Photo(Model, PhotoUtils):
     height = columns.SmallInt()
     low_quality_src = columns.Text()
     src = columns.Text()
+    # no longer maintained, the tallies of the photos are counters (see PhotoCounters)
     liked_nb = columns.SmallInt(default=0)
     high_quality_src = columns.Text()
-    liked_users = columns.Set(columns.Text())
     mentioned_users = columns.Set(columns.Text())
     comment_nb = columns.SmallInt(default=0)
-    comments = columns.Set(columns.Text())
+    # the liked_users and comments sets of the table are no longer read, see LikesByPhoto and CommentsByPhoto
 
+    liked_users: List[Dict] = ()
+    comments: List[Comment] = ()
     hasLiked: bool = False
 
     def to_dict(self) -> Dict:
         return {
             "reducedPhoto": self.to_reduced_photo_dict(),
             "hqSrc": self.high_quality_src,
-            "likedUsers": [u.to_reduced_dict() for u in self.liked_users],
-            "mentionedUsers": [u.to_reduced_dict() for u in self.mentioned_users],
-            "commentNb": self.comment_nb,
+            "likedUsers": list(self.liked_users),
+            "mentionedUsers": list(self.mentioned_users),
+            "commentNb": get_counter(PhotoCounters, 'comment_nb', self.photo_id),
             "comments": [c.to_dict() for c in self.comments],
             "hasLiked": self.hasLiked,
         }
@@ -176,62 +179,100 @@ class Photo(Model, PhotoUtils):
             "height": self.height,
             "lqSrc": self.low_quality_src,
             "src": self.src,
-            "likedNb": self.liked_nb
+            "likedNb": get_counter(PhotoCounters, 'liked_nb', self.photo_id)
         }
 
     @classmethod
     def get_photo_by_photo_id(cls, photo_id: str) -> Photo:
         try:
-            return cls.get(photo_id=photo_id)
+            return get_model_by_primary_key(cls, photo_id)
         except DoesNotExist:
             LOGGER.warning(f"Photo {photo_id} is not found.")
             raise PhotoNotFound(f"Photo {photo_id} is not found in Cassandra database")
 
-    def get_liked_users_info(self, sort_by: str, nb: int) -> List[User]:
-        # TODO: when # of liked users is large, the code will be slow !
-        # Need to handle the like/unlike in a cache such as Redis
-        liked_users = []
-        for uid in self.liked_users:
-            try:
-                user = User.get(user_id=uid)
-            except UserNotFound:
-                user = None
-            liked_users.append(user)
-        liked_users.sort(key=lambda x: getattr(x, sort_by))
-        return liked_users[:nb]
-
-    def get_mentioned_users_info(self, sort_by: str, nb: int = None) -> List[User]:
-        mentioned_users = []
-        for uid in self.mentioned_users:
-            try:
-                user = User.get(user_id=uid)
-            except UserNotFound:
-                user = None
-            mentioned_users.append(user)
-        mentioned_users.sort(key=lambda x: getattr(x, sort_by))
-        if nb is None:
-            return mentioned_users
-        return mentioned_users[:nb]
+    def get_liked_users_info(self, nb: int) -> List[Dict]:
+        """
+        Preview of the users having liked the photo: the first nb likes of the partition, in user id order, since
+        picking the first ones by any other sort would read every like of the photo.
+        """
+        user_ids = LikesByPhoto.get_user_ids(photo_id=self.photo_id, nb=nb)
+        # users which no longer exist are simply not returned by the query
+        users = User.get_users_by_ids(user_ids=user_ids, start_index=0, user_nb=nb)
+        positions = {user_id: position for position, user_id in enumerate(user_ids)}
+        return sorted(users, key=lambda user: positions[user['id']])
+
+    def get_mentioned_users_info(self, sort_by: str, nb: int = None) -> List[Dict]:
+        return User.get_users_by_ids(user_ids=list(self.mentioned_users), sort_by=sort_by, sort_desc=False,
+                                     start_index=0, user_nb=nb)
 
     def get_photo_information(
             self,
             photo_id: str,
             current_user_id: str,
-            liked_users_sort_by: str = SortType.CREATE_TIME.value,
             liked_user_nb: int = 6,
             comments_sort_by: str = SortType.CREATE_TIME.value,
             comment_nb: int = 6
     ) -> Dict:
-        photo = Photo.get_photo_by_photo_id(photo_id=photo_id)
-        photo.liked_users = self.get_liked_users_info(sort_by=liked_users_sort_by, nb=liked_user_nb)
-        photo.mentioned_users = self.get_mentioned_users_info(sort_by=SortType.CREATE_TIME.value)
-        photo.comments = CommentsByPhoto.get_comments_objects(
+        self.liked_users = self.get_liked_users_info(nb=liked_user_nb)
+        self.mentioned_users = self.get_mentioned_users_info(sort_by=SortType.CREATE_TIME.value)
+        self.comments = CommentsByPhoto.get_comments_objects(
             photo_id=photo_id,
             current_user_id=current_user_id,
             replies_sort_by=comments_sort_by,
             reply_nb=comment_nb)
-        photo.hasLiked = current_user_id in self.liked_users
-        return photo.to_dict()
+        self.hasLiked = LikesByPhoto.has_liked(photo_id=photo_id, user_id=current_user_id)
+        User.prime_reduced_users([self.owner])
+        return self.to_dict()
+
+
+class LikesByPhoto(Model):
+    """
+    One row per user having liked the photo, a like or an unlike only writes that row.
+
+    Likes and unlikes are conditional (lightweight transactions), because the liked_nb counter can't be incremented
+    idempotently: only the applied ones are counted, so that a repeated like or unlike doesn't change the tally.
+    """
+    __table_name__ = "likes_by_photo"
+
+    photo_id = columns.Text(primary_key=True)
+    user_id = columns.Text(primary_key=True)
+    create_time = columns.DateTime()
+
+    @classmethod
+    def like(cls, photo_id: str, user_id: str) -> bool:
+        """Return whether the photo was not liked by the user yet, so that the tally is only incremented once."""
+        try:
+            cls.if_not_exists().create(photo_id=photo_id, user_id=user_id, create_time=get_current_timestamp())
+            return True
+        except LWTException:
+            return False
+
+    @classmethod
+    def unlike(cls, photo_id: str, user_id: str) -> bool:
+        """Return whether the photo was liked by the user."""
+        try:
+            cls.objects(photo_id=photo_id, user_id=user_id).if_exists().delete()
+            return True
+        except LWTException:
+            return False
+
+    @classmethod
+    def has_liked(cls, photo_id: str, user_id: str) -> bool:
+        try:
+            get_model_by_primary_key(cls, photo_id, user_id)
+            return True
+        except DoesNotExist:
+            return False
+
+    @classmethod
+    def get_user_ids(cls, photo_id: str, nb: Optional[int] = None) -> List[str]:
+        """Get the ids of the users having liked the photo, at most nb of them."""
+        if nb is None:
+            rows = PREPARED_STATEMENTS.execute(get_select_partition_cql(cls, 'photo_id'), [photo_id])
+        else:
+            rows = PREPARED_STATEMENTS.execute(get_select_partition_cql(cls, 'photo_id', with_limit=True),
+                                               [photo_id, nb])
+        return [row['user_id'] for row in rows]
 
 
 class Trip(Model, TripUtils):
@@ -269,7 +310,7 @@ class Trip(Model, TripUtils):
             "status": self.status,
             "name": self.name,
             "description": self.description,
-            "users": [u.to_reduced_dict() for u in self.users],
+            "users": list(self.users),
             "createTime": convert_date_to_timestamp_in_expected_unit(self.create_time),
             "beginTime": convert_date_to_timestamp_in_expected_unit(self.begin_time) if self.begin_time else None,
             "endTime": convert_date_to_timestamp_in_expected_unit(self.end_time) if self.end_time else None,
@@ -280,7 +321,7 @@ class Trip(Model, TripUtils):
     @classmethod
     def get_trip_by_trip_id(cls, trip_id: str) -> Trip:
         try:
-            return cls.get(trip_id=trip_id)
+            return get_model_by_primary_key(cls, trip_id)
         except DoesNotExist:
             LOGGER.warning(f"Trip {trip_id} is not found.")
             raise TripNotFound(f"Trip {trip_id} is not found in Cassandra database.")
@@ -291,13 +332,14 @@ class Trip(Model, TripUtils):
         return self.to_dict()
 
     def get_users(self, users_sort_type, start_index: int, user_nb: int = None) -> List[Dict]:
-        users = User.get_users_by_ids(user_ids=self.users, sort_by=users_sort_type, user_nb=user_nb,
-                                      start_index=start_index, sort_desc=False)
-        return [u.to_reduced_dict() for u in users]
+        return User.get_users_by_ids(user_ids=self.users, sort_by=users_sort_type, user_nb=user_nb,
+                                     start_index=start_index, sort_desc=False)
 
 
 class TripsByUser(Model, TripUtils):
     __table_name__ = "trips_by_user"
+    # materialized view partitioned by access level as well, see get_filtered_models_page
+    ACCESS_LEVEL_VIEW = 'trips_by_user_and_access_level'
 
     user_id = columns.Text(primary_key=True)
     create_time = columns.DateTime(primary_key=True, clustering_order="DESC")
@@ -323,7 +365,7 @@ class TripsByUser(Model, TripUtils):
             "status": self.status,
             "name": self.name,
             "description": self.description,
-            "users": [u.to_reduced_dict() for u in self.users],
+            "users": list(self.users),
             "beginTime": convert_date_to_timestamp_in_expected_unit(self.begin_time) if self.begin_time else None,
             "endTime": convert_date_to_timestamp_in_expected_unit(self.end_time) if self.end_time else None,
             "photoNb": self.photo_nb,
@@ -333,25 +375,44 @@ class TripsByUser(Model, TripUtils):
     @classmethod
     def get_trips(cls, user_id: str, sort_by: str = 'create_time', nb: int = 3, access_level=None,
                   start_index=0) -> List[Dict]:
-        trips = get_filtered_models(
+        return cls.get_trips_page(
+            user_id=user_id, sort_by=sort_by, nb=nb, access_level=access_level, start_index=start_index)[0]
+
+    @classmethod
+    def get_trips_page(cls, user_id: str, sort_by: str = 'create_time', nb: int = 3, access_level=None,
+                       start_index=0, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Get a page of trips and the cursor of the next page."""
+        trips, next_cursor = get_filtered_models_page(
             cls=cls,
             primary_key='user_id',
             sort_by=sort_by,
             id_value=user_id,
             nb=nb,
             access_level=access_level,
-            start_index=start_index)  # trips: List[TripsByUser]
+            start_index=start_index,
+            cursor=cursor)  # trips: List[TripsByUser]
+        # the first users of every trip are read with one query, at most TRIP_PREVIEW_USER_NB of them per trip
+        users_by_trip = User.get_users_by_groups(
+            user_ids_by_group={trip.trip_id: trip.users for trip in trips},
+            sort_by='nickName',
+            sort_desc=False,
+            user_nb=TRIP_PREVIEW_USER_NB)
+        # the cover photos are read concurrently
+        cover_photo_ids = {trip.trip_id: str(trip.cover_photo) for trip in trips if trip.cover_photo}
+        cover_photos = dict(zip(
+            cover_photo_ids.keys(),
+            get_models_by_primary_keys(Photo, [(photo_id,) for photo_id in cover_photo_ids.values()])))
         for trip in trips:
-            trip.users = User.get_users_by_ids(user_ids=trip.users, sort_by='nickName', sort_desc=False)
-            try:
-                trip.cover_photo = Photo.get_photo_by_photo_id(photo_id=str(trip.cover_photo))
-            except PhotoNotFound:
-                trip.cover_photo = None
-        return [trip.to_dict() for trip in trips]
+            trip.cover_photo = cover_photos.get(trip.trip_id)
+            trip.users = users_by_trip[trip.trip_id]
+        User.prime_reduced_users(trip.cover_photo.owner for trip in trips if trip.cover_photo)
+        prime_counters(PhotoCounters, [(trip.cover_photo.photo_id,) for trip in trips if trip.cover_photo])
+        return [trip.to_dict() for trip in trips], next_cursor
 
 
 class PhotosByTrip(Model, PhotoUtils):
     __table_name__ = "photos_by_trip"
+    ACCESS_LEVEL_VIEW = 'photos_by_trip_and_access_level'
 
     trip_id = columns.Text(primary_key=True)
     create_time = columns.DateTime(primary_key=True, clustering_order="DESC")
@@ -383,25 +444,36 @@ class PhotosByTrip(Model, PhotoUtils):
             "height": self.height,
             "lqSrc": self.low_quality_src,
             "src": self.src,
-            "likedNb": self.liked_nb
+            "likedNb": get_counter(PhotoCounters, 'liked_nb', self.photo_id)
         }
 
     @classmethod
     def get_filtered_photos(cls, trip_id: str, sort_by: str, access_level: str, start_index: int,
                             nb: int = None) -> List[Dict]:
-        photos = get_filtered_models(
+        return cls.get_filtered_photos_page(
+            trip_id=trip_id, sort_by=sort_by, access_level=access_level, start_index=start_index, nb=nb)[0]
+
+    @classmethod
+    def get_filtered_photos_page(cls, trip_id: str, sort_by: str, access_level: str, start_index: int,
+                                 nb: int = None, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Get a page of photos and the cursor of the next page."""
+        photos, next_cursor = get_filtered_models_page(
             cls=cls,
             primary_key='trip_id',
             sort_by=sort_by,
             id_value=trip_id,
             nb=nb,
             start_index=start_index,
-            access_level=access_level)  # photos: List[PhotosByTrip]
-        return [photo.to_dict() for photo in photos]
+            access_level=access_level,
+            cursor=cursor)  # photos: List[PhotosByTrip]
+        User.prime_reduced_users(photo.owner for photo in photos)
+        prime_counters(PhotoCounters, [(photo.photo_id,) for photo in photos])
+        return [photo.to_dict() for photo in photos], next_cursor
 
 
 class AlbumsByUser(Model):
     __table_name__ = "albums_by_user"
+    ACCESS_LEVEL_VIEW = 'albums_by_user_and_access_level'
 
     user_id = columns.Text(primary_key=True)
     create_time = columns.DateTime(primary_key=True, clustering_order='DESC')
@@ -412,20 +484,30 @@ class AlbumsByUser(Model):
     @classmethod
     def get_albums(cls, user_id: str, sort_by: str = 'create_time', nb: int = 3, access_level=None,
                    start_index=0) -> List[Dict]:
-        albums = get_filtered_models(
+        return cls.get_albums_page(
+            user_id=user_id, sort_by=sort_by, nb=nb, access_level=access_level, start_index=start_index)[0]
+
+    @classmethod
+    def get_albums_page(cls, user_id: str, sort_by: str = 'create_time', nb: int = 3, access_level=None,
+                        start_index=0, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Get a page of albums and the cursor of the next page."""
+        albums, next_cursor = get_filtered_models_page(
             cls=cls,
             primary_key='user_id',
             id_value=user_id,
             sort_by=sort_by,
             nb=nb,
             access_level=access_level,
-            start_index=start_index)  # albums: List[AlbumsByUser]
+            start_index=start_index,
+            cursor=cursor)  # albums: List[AlbumsByUser]
         for album in albums:
             # convert cover_photos from set to list
             # so that it can be sortable
             album.cover_photos = list(album.cover_photos)
             album.cover_photos.sort(key=lambda x: x.photo.create_time)
-        return [album.to_dict() for album in albums]
+            User.prime_reduced_users(cover_photo.photo.owner for cover_photo in album.cover_photos)
+            prime_counters(PhotoCounters, [(cover_photo.photo.photo_id,) for cover_photo in album.cover_photos])
+        return [album.to_dict() for album in albums], next_cursor
 
     def to_dict(self) -> Dict:
         return {
@@ -438,6 +520,7 @@ class AlbumsByUser(Model):
 
 class MentionsByUser(Model):
     __table_name__ = "mentions_by_user"
+    ACCESS_LEVEL_VIEW = 'mentions_by_user_and_access_level'
 
     user_id = columns.Text(primary_key=True)
     create_time = columns.DateTime(primary_key=True, clustering_order="DESC")
@@ -448,15 +531,25 @@ class MentionsByUser(Model):
     @classmethod
     def get_mentions(cls, user_id: str, sort_by: str = 'create_time', nb: int = 3, access_level: str = 'everyone',
                      start_index=0) -> List[Dict]:
-        mentions = get_filtered_models(
+        return cls.get_mentions_page(
+            user_id=user_id, sort_by=sort_by, nb=nb, access_level=access_level, start_index=start_index)[0]
+
+    @classmethod
+    def get_mentions_page(cls, user_id: str, sort_by: str = 'create_time', nb: int = 3, access_level: str = 'everyone',
+                          start_index=0, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Get a page of mentions and the cursor of the next page."""
+        mentions, next_cursor = get_filtered_models_page(
             cls=cls,
             primary_key='user_id',
             id_value=user_id,
             sort_by=sort_by,
             nb=nb,
             access_level=access_level,
-            start_index=start_index)  # mentions: List[MentionsByUser]
-        return [mention.to_dict() for mention in mentions]
+            start_index=start_index,
+            cursor=cursor)  # mentions: List[MentionsByUser]
+        User.prime_reduced_users(mention.photo.owner for mention in mentions)
+        prime_counters(PhotoCounters, [(mention.photo.photo_id,) for mention in mentions])
+        return [mention.to_dict() for mention in mentions], next_cursor
 
     def to_dict(self) -> Dict:
         return {
@@ -469,6 +562,7 @@ class MentionsByUser(Model):
 
 class HighlightsByUser(Model):
     __table_name__ = "highlights_by_user"
+    ACCESS_LEVEL_VIEW = 'highlights_by_user_and_access_level'
 
     user_id = columns.Text(primary_key=True)
     create_time = columns.DateTime(primary_key=True, clustering_order="DESC")
@@ -480,20 +574,28 @@ class HighlightsByUser(Model):
     @classmethod
     def get_highlights(cls, user_id: str, sort_by: str = 'create_time', nb: int = 3, access_level=None,
                        start_index=0) -> List[Dict]:
-        highlights = get_filtered_models(
+        return cls.get_highlights_page(
+            user_id=user_id, sort_by=sort_by, nb=nb, access_level=access_level, start_index=start_index)[0]
+
+    @classmethod
+    def get_highlights_page(cls, user_id: str, sort_by: str = 'create_time', nb: int = 3, access_level=None,
+                            start_index=0, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Get a page of highlights and the cursor of the next page."""
+        highlights, next_cursor = get_filtered_models_page(
             cls=cls,
             primary_key='user_id',
             id_value=user_id,
             sort_by=sort_by,
             nb=nb,
             access_level=access_level,
-            start_index=start_index)  # highlights: List[HighlightsByUser]
+            start_index=start_index,
+            cursor=cursor)  # highlights: List[HighlightsByUser]
         for highlight in highlights:
             try:
                 Photo.get_photo_by_photo_id(photo_id=str(highlight.cover_photo))
             except PhotoNotFound:
                 highlight.cover_photo = None
-        return [highlight.to_dict() for highlight in highlights]
+        return [highlight.to_dict() for highlight in highlights], next_cursor
 
     def to_dict(self) -> Dict:
         return {
@@ -516,38 +618,97 @@ def create_and_return_new_trip(owner_id: str, trip_name: str, user_ids: List[str
         users=set(user_ids)
     )
     new_trip = Trip.create_from_reduced_trip(reduced_trip=reduced_trip)
-    for user_id in user_ids:
-        TripsByUser.create_from_reduced_trip(reduced_trip=reduced_trip, user_id=user_id)
+    write_trip_memberships(trip=new_trip, user_ids_to_add=new_trip.users)
     return new_trip
 
 
-def delete_photos(trip_id: str, photo_ids: List[str]):
-    # 1. Delete photo in Photo
-    # 2. Delete photo in PhotosByTrip
-    # 3. Delete images in minio
+def _build_trip_by_user(trip: Trip, user_id: str) -> TripsByUser:
+    trip_values = {name: getattr(trip, name) for name in TripsByUser._columns.keys() & Trip._columns.keys()}
+    trip_values['cover_photo'] = trip.cover_photo.photo_id if trip.cover_photo else None
+    return TripsByUser(user_id=user_id, **trip_values)
+
+
+def write_trip_memberships(trip: Trip, user_ids_to_add: Iterable[str] = (), user_ids_to_update: Iterable[str] = (),
+                           attributes_to_update: Optional[Dict] = None, user_ids_to_delete: Iterable[str] = ()):
+    """
+    Fan the trip out to the trips_by_user partitions of its members, concurrently and without reading them:
+    their primary keys are known from the trip.
+
+    The records of the users to add are written from the trip, the ones of the users to update only get the given
+    attributes and the ones of the users to delete are deleted.
+    """
+    statements = [get_insert_statement(_build_trip_by_user(trip, user_id)) for user_id in user_ids_to_add]
+    if attributes_to_update:
+        statements += [
+            get_update_statement(TripsByUser, (user_id, trip.create_time, trip.trip_id), attributes_to_update)
+            for user_id in user_ids_to_update]
+    statements += [get_delete_statement(TripsByUser, (user_id, trip.create_time, trip.trip_id))
+                   for user_id in user_ids_to_delete]
+    PREPARED_STATEMENTS.execute_concurrent_statements(statements)
+
+
+def delete_photos(trip_id: str, photo_ids: List[str], remove_images_in_background: bool = True):
+    # 1. Load the photos in one query
+    # 2. Delete them in Photo, PhotosByTrip, LikesByPhoto and PhotoCounters concurrently
+    # 3. Delete images in minio with bulk requests, on the background worker by default
     if photo_ids is not None and len(photo_ids) > 0:
-        for photo_id in photo_ids:
-            photo = Photo.get(photo_id=photo_id)
-            PhotosByTrip.get(
-                trip_id=trip_id,
-                photo_id=photo_id,
-                create_time=photo.create_time
-            ).delete()
-            photo.delete()
-            remove_image_by_url(photo.high_quality_src)
-            remove_image_by_url(photo.src)
-            remove_image_by_url(photo.low_quality_src)
+        photo_ids = set(photo_ids)
+        photos = get_models_by_partition_keys(Photo, list(photo_ids))
+        if len(photos) < len(photo_ids):
+            LOGGER.warning(f"Photos {photo_ids - {photo.photo_id for photo in photos}} are not found.")
+        statements = []
+        for photo in photos:
+            statements += [
+                get_delete_statement(PhotosByTrip, (trip_id, photo.create_time, photo.photo_id)),
+                get_delete_statement(Photo, (photo.photo_id,)),
+                get_delete_statement(LikesByPhoto, (photo.photo_id,)),
+                # so that the tallies are not inherited by a photo with the same id
+                get_delete_statement(PhotoCounters, (photo.photo_id,)),
+            ]
+        PREPARED_STATEMENTS.execute_concurrent_statements(statements)
+        image_urls = [url for photo in photos for url in (photo.high_quality_src, photo.src, photo.low_quality_src)]
+        if remove_images_in_background:
+            remove_images_by_urls_in_background(image_urls)
+        else:
+            remove_images_by_urls(image_urls)
 
 
 def delete_all_about_given_trip(trip_id: str, photo_ids=None):
     # only used for integration test
     trip = Trip.get_trip_by_trip_id(trip_id=trip_id)
-    for user_id in trip.users:
-        trips_by_user_record = TripsByUser.get(
-            user_id=user_id,
-            trip_id=trip_id,
-            create_time=trip.create_time
-        )
-        trips_by_user_record.delete()
-    delete_photos(trip_id, photo_ids)
+    write_trip_memberships(trip=trip, user_ids_to_delete=trip.users)
+    delete_photos(trip_id, photo_ids, remove_images_in_background=False)
     trip.delete()
+
+
+def prepare_hot_statements():
+    """Prepare the statements of the hot reads with their default sorting, so that requests don't wait for it."""
+    default_order_by = ['create_time']
+    PREPARED_STATEMENTS.prepare([
+        get_select_by_primary_key_cql(Trip),
+        get_select_by_primary_key_cql(Photo),
+        get_select_by_primary_key_cql(Comment),
+        get_select_by_primary_key_cql(LikesByPhoto),
+        get_select_partition_cql(LikesByPhoto, 'photo_id', with_limit=True),
+        get_select_by_primary_key_cql(PhotoCounters),
+        get_select_by_primary_key_cql(CommentCounters),
+        get_select_by_primary_key_cql(ReplyCounters),
+        get_increment_counter_cql(PhotoCounters, 'liked_nb'),
+        get_select_partition_cql(TripsByUser, 'user_id', order_by=default_order_by),
+        get_select_partition_cql(AlbumsByUser, 'user_id', order_by=default_order_by),
+        get_select_partition_cql(HighlightsByUser, 'user_id', order_by=default_order_by),
+        get_select_partition_cql(MentionsByUser, 'user_id', order_by=default_order_by),
+        get_select_partition_cql(PhotosByTrip, 'trip_id', order_by=default_order_by),
+        get_select_partition_cql(TripsByUser, ['user_id', 'access_level'], order_by=default_order_by,
+                                 view=TripsByUser.ACCESS_LEVEL_VIEW),
+        get_select_partition_cql(AlbumsByUser, ['user_id', 'access_level'], order_by=default_order_by,
+                                 view=AlbumsByUser.ACCESS_LEVEL_VIEW),
+        get_select_partition_cql(HighlightsByUser, ['user_id', 'access_level'], order_by=default_order_by,
+                                 view=HighlightsByUser.ACCESS_LEVEL_VIEW),
+        get_select_partition_cql(MentionsByUser, ['user_id', 'access_level'], order_by=default_order_by,
+                                 view=MentionsByUser.ACCESS_LEVEL_VIEW),
+        get_select_partition_cql(PhotosByTrip, ['trip_id', 'access_level'], order_by=default_order_by,
+                                 view=PhotosByTrip.ACCESS_LEVEL_VIEW),
+        get_select_partition_cql(CommentsByPhoto, 'photo_id'),
+        get_select_partition_cql(EntitiesByComment, 'comment_id'),
+    ])
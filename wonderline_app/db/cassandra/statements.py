@@ -0,0 +1,198 @@
+"""
+Prepared statements of the hot Cassandra reads.
+
+cqlengine generates the CQL of every query again and sends it as a simple statement, which Cassandra parses again.
+The reads below are prepared once per driver session instead, and their rows are turned into models the same way as
+cqlengine does.
+"""
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Type, Union
+
+from cassandra.concurrent import execute_concurrent, execute_concurrent_with_args
+from cassandra.cqlengine import connection
+from cassandra.cqlengine.models import Model
+from cassandra.metadata import protect_name
+from cassandra.query import PreparedStatement, UNSET_VALUE
+
+LOGGER = logging.getLogger(__name__)
+
+# maximum number of requests in flight for a concurrent fan-out
+CONCURRENCY = 50
+
+
+class PreparedStatementRegistry:
+    """Prepared statements keyed by their CQL, prepared again when the driver session changes (e.g. after a fork)."""
+
+    def __init__(self):
+        self._session = None
+        self._statements: Dict[str, PreparedStatement] = {}
+        self._lock = threading.Lock()
+
+    def get(self, cql: str) -> PreparedStatement:
+        session = connection.get_session()
+        statement = self._statements.get(cql) if session is self._session else None
+        if statement is None:
+            with self._lock:
+                if session is not self._session:
+                    self._session = session
+                    self._statements = {}
+                statement = self._statements.get(cql)
+                if statement is None:
+                    statement = session.prepare(cql)
+                    self._statements[cql] = statement
+        return statement
+
+    def prepare(self, cqls: Iterable[str]):
+        for cql in cqls:
+            self.get(cql)
+
+    def execute_concurrent(self, cql: str, parameters_list: Sequence[Sequence]) -> List:
+        """Execute the statement once per parameters, concurrently, and get the result sets in the same order."""
+        results = execute_concurrent_with_args(
+            connection.get_session(), self.get(cql), parameters_list, concurrency=CONCURRENCY)
+        return [result for _, result in results]
+
+    def execute_concurrent_statements(self, cqls_and_parameters: Sequence[Tuple[str, Sequence]]) -> List:
+        """Same as execute_concurrent with a statement per parameters."""
+        results = execute_concurrent(
+            connection.get_session(),
+            [(self.get(cql), parameters) for cql, parameters in cqls_and_parameters],
+            concurrency=CONCURRENCY)
+        return [result for _, result in results]
+
+    def execute(self, cql: str, parameters: Sequence, fetch_size: Optional[int] = None, paging_state=None):
+        bound_statement = self.get(cql).bind(parameters)
+        if fetch_size is not None:
+            bound_statement.fetch_size = fetch_size
+        return connection.get_session().execute(bound_statement, paging_state=paging_state)
+
+
+PREPARED_STATEMENTS = PreparedStatementRegistry()
+
+
+def _get_db_field(cls: Type[Model], column_name: str) -> str:
+    return cls._columns[column_name].db_field_name
+
+
+def _get_selected_columns(cls: Type[Model]) -> str:
+    """Only the columns of the model are read, the other columns of the table are left aside."""
+    return ', '.join(f'"{column.db_field_name}"' for column in cls._columns.values())
+
+
+def get_select_by_primary_key_cql(cls: Type[Model]) -> str:
+    conditions = ' AND '.join(f'"{column.db_field_name}" = ?' for column in cls._primary_keys.values())
+    return f'SELECT {_get_selected_columns(cls)} FROM {cls.column_family_name()} WHERE {conditions}'
+
+
+def get_insert_cql(cls: Type[Model]) -> str:
+    placeholders = ', '.join('?' for _ in cls._columns)
+    return f'INSERT INTO {cls.column_family_name()} ({_get_selected_columns(cls)}) VALUES ({placeholders})'
+
+
+def get_table_name(cls: Type[Model], view: Optional[str] = None) -> str:
+    """Get the name of the table of the model, or of one of its materialized views, with its keyspace."""
+    if view is None:
+        return cls.column_family_name()
+    return f'{protect_name(cls._get_keyspace())}.{protect_name(view)}'
+
+
+def get_select_partition_cql(cls: Type[Model], partition_key: Union[str, Sequence[str]],
+                             order_by: Optional[List[str]] = None, with_limit: bool = False,
+                             view: Optional[str] = None) -> str:
+    """
+    Build the CQL reading a partition of the table of the model, or of one of its materialized views,
+    order_by follows the cqlengine convention ("-" for descending).
+    """
+    partition_key = [partition_key] if isinstance(partition_key, str) else partition_key
+    conditions = ' AND '.join(f'"{_get_db_field(cls, column_name)}" = ?' for column_name in partition_key)
+    cql = f'SELECT {_get_selected_columns(cls)} FROM {get_table_name(cls, view=view)} WHERE {conditions}'
+    if order_by:
+        orderings = []
+        for column_name in order_by:
+            direction = 'DESC' if column_name.startswith('-') else 'ASC'
+            orderings.append(f'"{_get_db_field(cls, column_name.lstrip("-"))}" {direction}')
+        cql += ' ORDER BY ' + ', '.join(orderings)
+    if with_limit:
+        cql += ' LIMIT ?'
+    return cql
+
+
+def construct_models(cls: Type[Model], rows: Iterable[Dict]) -> List[Model]:
+    return [cls._construct_instance(row) for row in rows]
+
+
+def get_model_by_primary_key(cls: Type[Model], *primary_key_values) -> Model:
+    """
+    Same as `cls.get(...)` given the values of all the primary key columns, with a prepared statement.
+
+    :raise cls.DoesNotExist
+    """
+    rows = PREPARED_STATEMENTS.execute(get_select_by_primary_key_cql(cls), primary_key_values).current_rows
+    if not rows:
+        raise cls.DoesNotExist(f"{cls.__name__} {primary_key_values} does not exist")
+    return cls._construct_instance(rows[0])
+
+
+def get_models_by_partition_keys(cls: Type[Model], partition_key_values: Sequence) -> List[Model]:
+    """Read the partitions of a model with a single-column partition key in one IN query."""
+    if len(cls._partition_keys) != 1:
+        raise ValueError(f"{cls.__name__} doesn't have a single-column partition key")
+    if not partition_key_values:
+        return []
+    partition_key = next(iter(cls._partition_keys.values()))
+    cql = f'SELECT {_get_selected_columns(cls)} FROM {cls.column_family_name()} ' \
+          f'WHERE "{partition_key.db_field_name}" IN ?'
+    return construct_models(cls, PREPARED_STATEMENTS.execute(cql, [list(partition_key_values)]))
+
+
+def get_models_by_primary_keys(cls: Type[Model], primary_key_values_list: Sequence[Sequence]) -> List[Optional[Model]]:
+    """Read several models by primary key concurrently, in the same order, None for the missing ones."""
+    if not primary_key_values_list:
+        return []
+    result_sets = PREPARED_STATEMENTS.execute_concurrent(get_select_by_primary_key_cql(cls), primary_key_values_list)
+    return [cls._construct_instance(rows[0]) if rows else None
+            for rows in (result_set.current_rows for result_set in result_sets)]
+
+
+def get_insert_statement(instance: Model) -> Tuple[str, List]:
+    """Get the CQL and the parameters upserting the model, see execute_concurrent_statements."""
+    instance.validate()
+    parameters = []
+    for name, column in instance._columns.items():
+        value = getattr(instance, name)
+        # the columns without value are left unset, as cqlengine does, instead of writing tombstones
+        parameters.append(UNSET_VALUE if value is None else column.to_database(value))
+    return get_insert_cql(type(instance)), parameters
+
+
+def get_update_statement(cls: Type[Model], primary_key_values: Sequence, values: Dict) -> Tuple[str, List]:
+    """Get the CQL and the parameters setting the given columns of a row, without reading it."""
+    assignments = ', '.join(f'"{_get_db_field(cls, column_name)}" = ?' for column_name in values)
+    conditions = ' AND '.join(f'"{column.db_field_name}" = ?' for column in cls._primary_keys.values())
+    parameters = [None if value is None else cls._columns[column_name].to_database(value)
+                  for column_name, value in values.items()]
+    return f'UPDATE {cls.column_family_name()} SET {assignments} WHERE {conditions}', \
+        parameters + _get_primary_key_parameters(cls, primary_key_values)
+
+
+def get_delete_statement(cls: Type[Model], primary_key_values: Sequence) -> Tuple[str, List]:
+    """Get the CQL and the parameters deleting a row, or every row of a partition given only its partition key."""
+    primary_keys = list(cls._primary_keys.values())[:len(primary_key_values)]
+    conditions = ' AND '.join(f'"{column.db_field_name}" = ?' for column in primary_keys)
+    return f'DELETE FROM {cls.column_family_name()} WHERE {conditions}', \
+        _get_primary_key_parameters(cls, primary_key_values)
+
+
+def _get_primary_key_parameters(cls: Type[Model], primary_key_values: Sequence) -> List:
+    return [column.to_database(value) for column, value in zip(cls._primary_keys.values(), primary_key_values)]
+
+
+def insert_models(instances: Sequence[Model]):
+    """
+    Insert models, possibly of several classes, concurrently with prepared statements.
+
+    Unlike `cls.if_not_exists().create(...)` there is no lightweight transaction: an existing row with the same
+    primary key is overwritten, so it is meant for rows whose ids were just generated.
+    """
+    PREPARED_STATEMENTS.execute_concurrent_statements([get_insert_statement(instance) for instance in instances])
@@ -1,9 +1,14 @@
+import hashlib
 import logging
-from typing import List, Union, Type, Optional
+from typing import List, Union, Type, Optional, Tuple
 
+from cassandra import InvalidRequest
 from cassandra.cqlengine.models import Model
+from cassandra.protocol import ProtocolException
 
 from wonderline_app.api.common.enums import SortType
+from wonderline_app.db.cassandra.statements import PREPARED_STATEMENTS, get_select_partition_cql, construct_models
+from wonderline_app.utils import encode_cursor, decode_cursor
 
 LOGGER = logging.getLogger(__name__)
 
@@ -29,29 +34,108 @@ def convert_sort_by(sort_by: Union[List[str], str]) -> List[str]:
     return converted_sort_by
 
 
-def get_filtered_models(
+def _get_page_query(cql: str, parameters: List, access_level: Optional[str], start_index: int) -> List:
+    """Identify the query of a page, so that its cursor is only accepted by the same query."""
+    # the CQL names the table or view and the sort order, it's digested to keep the cursor short
+    return [hashlib.sha1(cql.encode('utf-8')).hexdigest()[:16], parameters, access_level, start_index]
+
+
+def _encode_paging_state(paging_state: Optional[bytes], query: List) -> Optional[str]:
+    return encode_cursor([paging_state.hex(), *query]) if paging_state else None
+
+
+def _decode_paging_state(cursor: str, query: List) -> bytes:
+    """:raise ValueError when the cursor is malformed or was issued for another query"""
+    values = decode_cursor(cursor)
+    if len(values) != 1 + len(query) or not isinstance(values[0], str):
+        raise ValueError(f"Invalid cursor {cursor}")
+    cql_digest, parameters, access_level, start_index = values[1:]
+    if cql_digest != query[0]:
+        raise ValueError(f"The cursor {cursor} was issued for another list or sort order")
+    if parameters != query[1] or access_level != query[2]:
+        raise ValueError(f"The cursor {cursor} was issued for another owner or access level")
+    if start_index != query[3]:
+        raise ValueError(f"The cursor {cursor} was issued for the start index {start_index}, not {query[3]}")
+    try:
+        return bytes.fromhex(values[0])
+    except ValueError:
+        raise ValueError(f"Invalid cursor {cursor}")
+
+
+def get_filtered_models_page(
         cls: Type[Model],
         primary_key: str,
         id_value: str,
         sort_by: Optional[Union[str, List[str]]] = 'create_time',
         nb: Optional[int] = 3,
         access_level=None,
-        start_index=0
-) -> List[Model]:
-    models = cls.objects(getattr(cls, primary_key) == id_value)
-    if sort_by is not None:
-        sort_by: List[str] = convert_sort_by(sort_by)
-        models = models.order_by(*sort_by)
-    if nb is None:
-        models = models.limit(None)
-    elif nb < 0:
+        start_index=0,
+        cursor: Optional[str] = None
+) -> Tuple[List[Model], Optional[str]]:
+    """
+    Read a page of the models of a partition with a prepared statement, primary_key being the partition key, and get
+    the cursor of the next page (None when there are no more models).
+
+    The cursor wraps the paging state of the driver: when it's given, the page starts right after the previous one
+    in Cassandra and start_index only has to be the same as for the first page, so that a deep page costs the same as
+    the first one. A cursor is rejected (ValueError) by a query differing from the one which issued it, as the paging
+    state would locate another row otherwise.
+
+    When the model has an ACCESS_LEVEL_VIEW, i.e. a materialized view partitioned by primary_key and access_level,
+    the models filtered by access level are read from a partition of the view. Otherwise they're filtered in Python.
+    """
+    order_by = convert_sort_by(sort_by) if sort_by is not None else None
+    if nb is not None and nb < 0:
         raise ValueError(f"nb expected positive or None(no limit), got {nb}")
+    if nb == 0:
+        return [], None
+    view = getattr(cls, 'ACCESS_LEVEL_VIEW', None) if access_level is not None else None
+    if view is not None:
+        cql = get_select_partition_cql(cls, partition_key=[primary_key, 'access_level'], order_by=order_by, view=view)
+        parameters = [id_value, access_level]
     else:
-        models = models.limit(start_index + nb)
-
-    if access_level is not None:
-        models = [model for model in models if model.access_level == access_level]
+        cql = get_select_partition_cql(cls, partition_key=primary_key, order_by=order_by)
+        parameters = [id_value]
     if nb is None:
-        return models[start_index:]
+        # the result set fetches all the pages while being iterated
+        models = construct_models(cls, PREPARED_STATEMENTS.execute(cql, parameters))[start_index:]
+        next_cursor = None
     else:
-        return models[start_index:start_index + nb]
+        query = _get_page_query(cql, parameters, access_level=access_level, start_index=start_index)
+        paging_state = None
+        if cursor is not None:
+            paging_state = _decode_paging_state(cursor, query)
+            start_index = 0
+        try:
+            result_set = PREPARED_STATEMENTS.execute(
+                cql, parameters, fetch_size=start_index + nb, paging_state=paging_state)
+        except (InvalidRequest, ProtocolException):
+            if paging_state is None:
+                raise
+            raise ValueError(f"Invalid cursor {cursor}")
+        models = construct_models(cls, result_set.current_rows)[start_index:]
+        next_cursor = _encode_paging_state(result_set.paging_state, query)
+
+    if access_level is not None and view is None:
+        models = [model for model in models if model.access_level == access_level]
+    return models, next_cursor
+
+
+def get_filtered_models(
+        cls: Type[Model],
+        primary_key: str,
+        id_value: str,
+        sort_by: Optional[Union[str, List[str]]] = 'create_time',
+        nb: Optional[int] = 3,
+        access_level=None,
+        start_index=0
+) -> List[Model]:
+    """Read the models of a partition with a prepared statement, primary_key being the partition key."""
+    return get_filtered_models_page(
+        cls=cls,
+        primary_key=primary_key,
+        id_value=id_value,
+        sort_by=sort_by,
+        nb=nb,
+        access_level=access_level,
+        start_index=start_index)[0]
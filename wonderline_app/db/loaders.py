@@ -0,0 +1,74 @@
+"""
+Request-scoped batch loaders.
+
+A loader collects the keys needed while a response is being built and resolves all of them with one
+batched lookup the first time one of them is actually read (DataLoader style).
+"""
+import logging
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+from flask import g, has_app_context
+
+LOGGER = logging.getLogger(__name__)
+
+BatchLoadFunction = Callable[[List[Hashable]], Dict[Hashable, Any]]
+
+
+class BatchLoader:
+    def __init__(self, batch_load_fn: BatchLoadFunction):
+        self._batch_load_fn = batch_load_fn
+        self._pending = set()
+        self._resolved = {}
+
+    def prime(self, keys: Iterable[Hashable]):
+        """Queue keys so that they are fetched together with the next batch."""
+        for key in keys:
+            if key is not None and key not in self._resolved:
+                self._pending.add(key)
+
+    def load(self, key: Hashable) -> Optional[Any]:
+        """Return the value for the key, fetching it with every pending key if it's not resolved yet."""
+        if key is None:
+            return None
+        if key not in self._resolved:
+            self._pending.add(key)
+            self.dispatch()
+        return self._resolved.get(key)
+
+    def load_many(self, keys: Iterable[Hashable]) -> List[Optional[Any]]:
+        keys = list(keys)
+        self.prime(keys)
+        self.dispatch()
+        return [self._resolved.get(key) for key in keys]
+
+    def dispatch(self):
+        """Resolve all the pending keys with one call of the batch load function."""
+        if not self._pending:
+            return
+        keys = list(self._pending)
+        self._pending.clear()
+        LOGGER.debug(f"Batch loading {len(keys)} key(s)")
+        values = self._batch_load_fn(keys)
+        for key in keys:
+            # missing keys are resolved to None as well, so that they are not queried again
+            self._resolved[key] = values.get(key)
+
+    def clear(self, key: Hashable):
+        """Forget the resolved value of the key, e.g. after it has been updated."""
+        self._resolved.pop(key, None)
+        self._pending.discard(key)
+
+
+def get_request_loader(name: str, batch_load_fn: BatchLoadFunction) -> BatchLoader:
+    """
+    Get the loader with the given name for the current request.
+
+    Outside of an application context (e.g. scripts), a new loader is returned on every call.
+    """
+    if not has_app_context():
+        return BatchLoader(batch_load_fn)
+    if '_batch_loaders' not in g:
+        g._batch_loaders = {}
+    if name not in g._batch_loaders:
+        g._batch_loaders[name] = BatchLoader(batch_load_fn)
+    return g._batch_loaders[name]
@@ -1,9 +1,11 @@
+import functools
 import json
 import logging
 import os
+from typing import Iterable, List
 
 from minio import ResponseError, Minio
-from minio.error import NoSuchKey
+from minio.error import NoSuchKey, MultiDeleteError
 
 from wonderline_app.db.minio.exceptions import MinioObjectSavingError
 
@@ -61,7 +63,9 @@ def create_minio_bucket(bucket_name: str, location: str = "us-east-1"):
         LOGGER.exception(err)
 
 
+@functools.lru_cache(maxsize=None)
 def get_minio_client():
+    """The client is shared: it holds the pool of connections to Minio."""
     minio_client = Minio(
         endpoint=os.environ['MINIO_HOST'] + ':' + os.environ['MINIO_PORT'],
         access_key=os.environ['MINIO_ACCESS_KEY'],
@@ -96,3 +100,13 @@ def object_exists_in_minio(bucket_name: str, object_name: str):
 def remove_object_from_minio(bucket_name: str, object_name: str):
     minio_client = get_minio_client()
     minio_client.remove_object(bucket_name=bucket_name, object_name=object_name)
+
+
+def remove_objects_from_minio(bucket_name: str, object_names: Iterable[str]) -> List[MultiDeleteError]:
+    """Remove the objects with bulk requests (up to 1000 objects each) and return the errors."""
+    minio_client = get_minio_client()
+    # the removal is lazy: the requests are only sent while the returned errors are iterated over
+    errors = list(minio_client.remove_objects(bucket_name=bucket_name, objects_iter=object_names))
+    for error in errors:
+        LOGGER.error(f"Failed to remove the object {error.object_name} from minio: {error.error_message}")
+    return errors
@@ -2,6 +2,10 @@ class UserNotFound(Exception):
     pass
 
 
+class UserPrincipalNotFound(UserNotFound):
+    """The authenticated user of the request has been deleted since its session or token was issued."""
+
+
 class UserPasswordIncorrect(Exception):
     pass
 
@@ -1,24 +1,96 @@
+import functools
 import logging
 import os
+from typing import Dict, Any, Optional
 
+from flask import _app_ctx_stack
 from sqlalchemy import create_engine, MetaData
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import scoped_session, sessionmaker
 
+from wonderline_app.db.postgres.pool import MeteredQueuePool
+from wonderline_app.db.postgres.routing import RoutingSession, ReplicaLagMonitor
+
 LOGGER = logging.getLogger(__name__)
-engine = create_engine(
-    'postgresql://%s:%s@%s/%s' % (
-        os.environ.get('POSTGRES_USER'),
-        os.environ.get('POSTGRES_PASSWORD'),
-        os.environ.get('POSTGRES_HOST'),
-        os.environ.get('POSTGRES_DB')),
-    convert_unicode=True,
-    encoding='utf-8')
+
+
+def _create_engine(host: str) -> Engine:
+    return create_engine(
+        'postgresql://%s:%s@%s/%s' % (
+            os.environ.get('POSTGRES_USER'),
+            os.environ.get('POSTGRES_PASSWORD'),
+            host,
+            os.environ.get('POSTGRES_DB')),
+        convert_unicode=True,
+        encoding='utf-8',
+        poolclass=MeteredQueuePool,
+        pool_size=int(os.environ.get('POSTGRES_POOL_SIZE', 5)),
+        max_overflow=int(os.environ.get('POSTGRES_POOL_MAX_OVERFLOW', 10)),
+        pool_timeout=float(os.environ.get('POSTGRES_POOL_TIMEOUT', 30)),
+        pool_pre_ping=os.environ.get('POSTGRES_POOL_PRE_PING', 'true').lower() == 'true',
+        pool_recycle=int(os.environ.get('POSTGRES_POOL_RECYCLE', 1800)))
+
+
+engine = _create_engine(host=os.environ.get('POSTGRES_HOST'))
+# optional read replica, used by the read-only methods decorated with `read_from_replica`
+replica_engine = None
+replica_monitor = None
+if os.environ.get('POSTGRES_REPLICA_HOST'):
+    replica_engine = _create_engine(host=os.environ['POSTGRES_REPLICA_HOST'])
+    replica_monitor = ReplicaLagMonitor(
+        replica=replica_engine,
+        max_lag=float(os.environ.get('POSTGRES_REPLICA_MAX_LAG', 1)),
+        check_interval=float(os.environ.get('POSTGRES_REPLICA_LAG_CHECK_INTERVAL', 5)))
 
 try:
     postgres_meta_data = MetaData(bind=engine)
 except Exception as e:
     LOGGER.exception("Fail to bind meta data:", e)
-db_session = scoped_session(sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=engine))
+# one session per thread (or greenlet), removed when the app context of a request is torn down, so that the next
+# request of the thread starts with a new session (see wonderline_app._create_app). The threads working outside of
+# any app context, e.g. the build of the user search index, remove their session themselves.
+db_session = scoped_session(
+    sessionmaker(
+        class_=RoutingSession,
+        autocommit=False,
+        autoflush=False,
+        bind=engine,
+        replica=replica_engine,
+        replica_monitor=replica_monitor),
+    scopefunc=_app_ctx_stack.__ident_func__)
+
+
+def read_from_replica(func):
+    """
+    Send the queries of a read-only function to the read replica, when there is one and its lag is acceptable.
+
+    The current session keeps reading from the primary once it has written anything.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        session = db_session()
+        if not session.replica_depth and not session.can_use_replica():
+            return func(*args, **kwargs)
+        session.replica_depth += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            session.replica_depth -= 1
+
+    return wrapper
+
+
+def get_pool_metrics() -> Dict[str, Any]:
+    """Get the connection checkout wait times and the occupancy of the pool."""
+    return engine.pool.get_metrics()
+
+
+def get_replica_pool_metrics() -> Optional[Dict[str, Any]]:
+    """Same as `get_pool_metrics` for the read replica, with its last measured lag."""
+    if replica_engine is None:
+        return None
+    return {
+        **replica_engine.pool.get_metrics(),
+        "lag": replica_monitor.lag,
+    }
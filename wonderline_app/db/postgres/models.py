@@ -4,30 +4,50 @@ PostgreSQL ORM.
 from __future__ import annotations
 
 import logging
+import os
 import uuid
 
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterable, Tuple
 
-from flask import current_app
 from flask_login import UserMixin, current_user
-from itsdangerous import TimedJSONWebSignatureSerializer as Serializer
-from itsdangerous import SignatureExpired, BadSignature
-from sqlalchemy import Column, TEXT, ForeignKey, TIMESTAMP, VARCHAR, INTEGER, desc, asc, CHAR
+from sqlalchemy import Column, TEXT, ForeignKey, TIMESTAMP, VARCHAR, INTEGER, desc, asc, CHAR, exists, and_, tuple_, \
+    or_, func, select, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm.exc import NoResultFound
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from wonderline_app.api.common.enums import SortType, SearchSortType
+from wonderline_app.cache import create_cache
+from wonderline_app.core.auth import DEFAULT_TOKEN_EXPIRATION, generate_auth_token, decode_auth_token
 from wonderline_app.core.image_service import DEFAULT_AVATAR_URL
+from wonderline_app.core.search_index import USER_SEARCH_INDEX
+from wonderline_app.db.loaders import BatchLoader, get_request_loader
 from wonderline_app.db.postgres.exceptions import UserNotFound, UserPasswordIncorrect, UserTokenInvalid, \
-    UserTokenExpired
-from wonderline_app.db.postgres.init import db_session, postgres_meta_data
-from wonderline_app.utils import convert_date_to_timestamp_in_expected_unit, edit_distance
+    UserPrincipalNotFound
+from wonderline_app.db.postgres.init import db_session, postgres_meta_data, read_from_replica
+from wonderline_app.utils import convert_date_to_timestamp_in_expected_unit, encode_cursor, decode_cursor
 
 LOGGER = logging.getLogger(__name__)
 
+# reduced users are read by almost every photo, comment and reply, but they rarely change
+REDUCED_USER_CACHE = create_cache(
+    namespace='reduced_users',
+    max_size=int(os.environ.get('REDUCED_USER_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('REDUCED_USER_CACHE_TTL', 300)))
+# optional cache of follow edges, useful for hot profiles (disabled when the size is 0): a follow or an unfollow
+# is only seen once the cached edge expires, after FOLLOW_EDGE_CACHE_TTL seconds at worst
+FOLLOW_EDGE_CACHE = create_cache(
+    namespace='follow_edges',
+    max_size=int(os.environ.get('FOLLOW_EDGE_CACHE_SIZE', 0)),
+    ttl=float(os.environ.get('FOLLOW_EDGE_CACHE_TTL', 60)))
+
+
+def _get_follow_edge_key(follower_id: str, followee_id: str) -> str:
+    return f"{followee_id}:{follower_id}"
+
 
 class Custom:
     """Some custom logic here!"""
@@ -66,21 +86,11 @@ class User(Base, UserMixin):
     def __str__(self):
         return repr(self.to_dict)
 
-    def generate_auth_token(self, expiration=7200):
-        s = Serializer(current_app.config['SECRET_KEY'], expires_in=expiration)
-        return s.dumps({'id': self.id}).decode("ascii")
+    def generate_auth_token(self, expiration=DEFAULT_TOKEN_EXPIRATION):
+        return generate_auth_token(user_id=self.id, expiration=expiration)
 
     def verify_auth_token(self, token: str):
-        s = Serializer(current_app.config['SECRET_KEY'])
-        try:
-            data = s.loads(token)
-        except SignatureExpired as e:
-            LOGGER.exception(e)
-            raise UserTokenExpired
-        except BadSignature as e:
-            LOGGER.exception(e)
-            raise UserTokenInvalid
-        if self.id != data['id']:
+        if self.id != decode_auth_token(token):
             raise UserTokenInvalid
 
     @classmethod
@@ -105,6 +115,9 @@ class User(Base, UserMixin):
         )
         db_session.add(user)
         db_session.commit()
+        cls.invalidate_reduced_user(user_id=user_id)
+        if USER_SEARCH_INDEX.accepts_updates:
+            USER_SEARCH_INDEX.add(user.to_reduced_dict())
         LOGGER.info(f"Succeeded to create a new user email:{email}, unique_name: {unique_name}, id: {user_id}, "
                     f"name: {name}")
         return user
@@ -137,18 +150,70 @@ class User(Base, UserMixin):
             return None
 
     @classmethod
+    @read_from_replica
     def get_user_attributes_or_none(cls, user_id, reduced=True, **kwargs) -> Optional[Dict]:
+        if reduced:
+            # reduced users are resolved in batch with every other user id needed by the current request
+            return cls.get_reduced_user_loader().load(user_id)
         user = cls.get_user_or_none(user_id=user_id)
         if user:
-            if reduced:
-                return user.to_reduced_dict()
             return user.get_complete_attributes(**kwargs)
         return None
 
     @classmethod
+    @read_from_replica
+    def get_reduced_users_by_ids(cls, user_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Get the reduced attributes of several users keyed by user id.
+
+        Cached users are served from REDUCED_USER_CACHE, the others are fetched with a single query.
+        """
+        if not user_ids:
+            return {}
+        reduced_users = REDUCED_USER_CACHE.get_many(user_ids)
+        missing_user_ids = [user_id for user_id in user_ids if user_id not in reduced_users]
+        if missing_user_ids:
+            rows = cls.query_reduced_users().filter(cls.id.in_(missing_user_ids)).all()
+            fetched_reduced_users = {row.id: cls.row_to_reduced_dict(row) for row in rows}
+            REDUCED_USER_CACHE.set_many(fetched_reduced_users)
+            reduced_users.update(fetched_reduced_users)
+        # copy the cached dictionaries so that callers can't alter the cache
+        return {user_id: dict(reduced_user) for user_id, reduced_user in reduced_users.items()}
+
+    @classmethod
+    def invalidate_reduced_user(cls, user_id: str):
+        REDUCED_USER_CACHE.delete(user_id)
+        cls.get_reduced_user_loader().clear(user_id)
+
+    @classmethod
+    def get_reduced_user_loader(cls) -> BatchLoader:
+        return get_request_loader(name='reduced_users', batch_load_fn=cls.get_reduced_users_by_ids)
+
+    @classmethod
+    def prime_reduced_users(cls, user_ids: Iterable[str]):
+        """Declare the users whose reduced attributes will be serialized, so that they are fetched in one query."""
+        cls.get_reduced_user_loader().prime(user_ids)
+
+    @classmethod
+    def query_reduced_users(cls, *extra_columns):
+        """
+        Query only the reduced columns, followed by the extra columns if any.
+
+        The rows are plain named tuples: no User is built nor added to the identity map of the session.
+        """
+        return db_session.query(*[getattr(cls, key) for key in cls.__reduced_keys], *extra_columns)
+
+    @classmethod
+    def row_to_reduced_dict(cls, row) -> Dict:
+        """Build the reduced attributes from a row of `query_reduced_users`, ignoring the extra columns."""
+        return dict(zip(cls.__reduced_keys, row))
+
+    @classmethod
+    @read_from_replica
     def get_users_by_ids(cls, user_ids: List[str], sort_by: str = SortType.CREATE_TIME.value, sort_desc: bool = True,
                          start_index: int = 0,
-                         user_nb: int = 6) -> List[User]:
+                         user_nb: int = 6) -> List[Dict]:
+        """Get the reduced attributes of the users, sorted and paginated."""
         if user_ids is None or not len(user_ids):
             return []
         if sort_desc:
@@ -159,10 +224,44 @@ class User(Base, UserMixin):
             end_index = None
         else:
             end_index = start_index + user_nb
-        return cls.query.filter(cls.id.in_(user_ids)). \
-            order_by(sort_order(getattr(User, sort_by))). \
+        # the id breaks ties so that the sorting and the pagination are deterministic
+        rows = cls.query_reduced_users().filter(cls.id.in_(user_ids)). \
+            order_by(sort_order(getattr(User, sort_by)), sort_order(User.id)). \
             slice(start_index, end_index). \
             all()
+        return [cls.row_to_reduced_dict(row) for row in rows]
+
+    @classmethod
+    @read_from_replica
+    def get_users_by_groups(cls, user_ids_by_group: Dict[str, Iterable[str]], sort_by: str = SortType.CREATE_TIME.value,
+                            sort_desc: bool = True, user_nb: int = 6) -> Dict[str, List[Dict]]:
+        """
+        Get the reduced attributes of the first user_nb users of each group (e.g. the users of each trip), sorted,
+        with one query returning at most user_nb rows per group.
+        """
+        memberships = [(group, user_id) for group, user_ids in user_ids_by_group.items() for user_id in user_ids]
+        users_by_group = {group: [] for group in user_ids_by_group}
+        if not memberships or user_nb <= 0:
+            return users_by_group
+        groups, user_ids = zip(*memberships)
+        membership_table = select([
+            func.unnest(bindparam('groups', value=list(groups), type_=ARRAY(TEXT))).label('group_id'),
+            func.unnest(bindparam('user_ids', value=list(user_ids), type_=ARRAY(TEXT))).label('user_id'),
+        ]).alias('memberships')
+        sort_order = desc if sort_desc else asc
+        rank = func.row_number().over(
+            partition_by=membership_table.c.group_id,
+            order_by=(sort_order(getattr(User, sort_by)), sort_order(User.id))).label('rank')
+        ranked_users = cls.query_reduced_users(membership_table.c.group_id, rank). \
+            join(membership_table, membership_table.c.user_id == User.id). \
+            subquery()
+        rows = db_session.query(ranked_users). \
+            filter(ranked_users.c.rank <= user_nb). \
+            order_by(ranked_users.c.group_id, ranked_users.c.rank). \
+            all()
+        for row in rows:
+            users_by_group[row.group_id].append(cls.row_to_reduced_dict(row))
+        return users_by_group
 
     def to_reduced_dict(self) -> Dict:
         user_info_mapping = super().to_dict()
@@ -186,44 +285,142 @@ class User(Base, UserMixin):
             follower_nb=follower_nb,
             sort_by=sort_by,
             start_index=start_index)
-        user_dict['isFollowedByLoginUser'] = current_user.id in (u.to_id for u in self.followers)
+        user_dict['isFollowedByLoginUser'] = self.is_followed_by(user_id=current_user.id)
         return user_dict
 
-    def get_followers(self, follower_nb: int, sort_by: str = SortType.CREATE_TIME.value, start_index: int = 0) -> List[
-        User]:
-        return User.query. \
+    @read_from_replica
+    def is_followed_by(self, user_id: str) -> bool:
+        """Check whether the user is followed by the given user without loading all the followers."""
+        edge_key = _get_follow_edge_key(follower_id=user_id, followee_id=self.id)
+        is_followed = FOLLOW_EDGE_CACHE.get(edge_key)
+        if is_followed is None:
+            # the lookup is covered by the primary key (from_id, to_id) of Followed
+            is_followed = db_session.query(
+                exists().where(and_(Followed.from_id == self.id, Followed.to_id == user_id))
+            ).scalar()
+            FOLLOW_EDGE_CACHE.set(edge_key, is_followed)
+        return is_followed
+
+    @read_from_replica
+    def get_followers(self, follower_nb: int, sort_by: str = SortType.CREATE_TIME.value, start_index: int = 0,
+                      cursor: Optional[str] = None) -> List[Tuple]:
+        """
+        Get the followers sorted by (sort_by, id) in descending order, as rows of their reduced columns followed by
+        the sort column.
+
+        The sort column is the copy of the follower's one in Followed, so that the index (from_id, sort column, to_id)
+        serves both the filter and the order. When a cursor is given, the followers after the cursor are returned
+        instead of skipping start_index rows, so that the cost of a page doesn't depend on its depth.
+        """
+        sort_column = Followed.get_sort_column(sort_by)
+        query = User.query_reduced_users(sort_column). \
             join(Followed, User.id == Followed.to_id). \
-            filter(Followed.from_id == self.id). \
-            order_by(desc(getattr(User, sort_by))). \
+            filter(Followed.from_id == self.id)
+        if cursor is not None:
+            sort_value, user_id = self._decode_followers_cursor(cursor=cursor, sort_by=sort_by)
+            query = query.filter(tuple_(sort_column, Followed.to_id) < tuple_(sort_value, user_id))
+            start_index = 0
+        return query. \
+            order_by(desc(sort_column), desc(Followed.to_id)). \
             slice(start_index, start_index + follower_nb). \
             all()
 
+    @staticmethod
+    def _encode_followers_cursor(sort_by: str, sort_value: Any, user_id: str) -> str:
+        if isinstance(sort_value, datetime):
+            sort_value = sort_value.isoformat()
+        return encode_cursor([sort_by, sort_value, user_id])
+
+    @staticmethod
+    def _decode_followers_cursor(cursor: str, sort_by: str) -> Tuple[Any, str]:
+        values = decode_cursor(cursor)
+        if len(values) != 3:
+            raise ValueError(f"Invalid cursor {cursor}")
+        cursor_sort_by, sort_value, user_id = values
+        if cursor_sort_by != sort_by:
+            # the values of another sort column can't locate the page
+            raise ValueError(f"The cursor {cursor} was issued for the sort type {cursor_sort_by}, not {sort_by}")
+        if isinstance(Followed.get_sort_column(sort_by).type, TIMESTAMP):
+            try:
+                sort_value = datetime.fromisoformat(sort_value)
+            except TypeError:
+                raise ValueError(f"Invalid cursor {cursor}")
+        return sort_value, user_id
+
     def get_followers_with_reduced_attributes(self, follower_nb: int, sort_by: str = SortType.CREATE_TIME.value,
                                               start_index: int = 0) -> List[Dict]:
+        return self.get_followers_page(follower_nb=follower_nb, sort_by=sort_by, start_index=start_index)[0]
+
+    def get_followers_page(self, follower_nb: int, sort_by: str = SortType.CREATE_TIME.value, start_index: int = 0,
+                           cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Get a page of followers with reduced attributes and the cursor of the next page."""
         if follower_nb <= 0:
-            return []
+            return [], None
         if start_index < 0:
             raise ValueError(f"start_index is expected to be non-negative, got {start_index}")
         followers = self.get_followers(
             follower_nb=follower_nb,
             sort_by=sort_by,
-            start_index=start_index
+            start_index=start_index,
+            cursor=cursor
         )
-        return [follower.to_reduced_dict() for follower in followers]
+        next_cursor = None
+        if len(followers) == follower_nb:
+            last_follower = followers[-1]
+            next_cursor = self._encode_followers_cursor(
+                sort_by=sort_by, sort_value=last_follower[-1], user_id=last_follower.id)
+        return [self.row_to_reduced_dict(follower) for follower in followers], next_cursor
 
     @staticmethod
+    @read_from_replica
     def search_users(name_query: str, start_index: int = 0, nb: int = 12,
-                     sort_type: str = SearchSortType.BEST_MATCH.value) -> List[Dict]:
+                     sort_type: str = SearchSortType.BEST_MATCH.value,
+                     user_ids: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        Search users whose nick name or unique name contains the query, among the given user ids if any.
+
+        Both the matching (served by the pg_trgm GIN indexes) and the ranking by trigram similarity
+        are done by PostgreSQL, only the requested page is returned. When the in-memory USER_SEARCH_INDEX
+        is enabled, it answers instead without querying PostgreSQL, except for the one-letter queries.
+
+        The index of a worker is only used once built, PostgreSQL answers until then (e.g. right after the start),
+        and the two rank the matches differently. A built index applies the users created or renamed by its own
+        worker at once, but the ones of the other workers only at its next rebuild: the results of a worker can
+        lag the writes by up to USER_SEARCH_INDEX_REFRESH_INTERVAL seconds, so the same query can get different
+        results from different workers meanwhile.
+        """
         if name_query is None or not len(name_query):
             return []
-        matched_users = User.query.filter(User.nickName.ilike(f"%{name_query}%")).all()
-        if sort_type == SearchSortType.BEST_MATCH.value:
-            matched_users.sort(key=lambda x: edit_distance(word1=name_query, word2=x.nickName))
-        else:
+        if user_ids is not None:
+            user_ids = list(user_ids)
+            if not user_ids:
+                return []
+        if sort_type != SearchSortType.BEST_MATCH.value:
             raise ValueError("Unknown sort_type for searching users")
-        if matched_users:
-            return [u.to_reduced_dict() for u in matched_users[start_index: start_index + nb]]
-        return []
+        if USER_SEARCH_INDEX.can_search(name_query):
+            return USER_SEARCH_INDEX.search(name_query=name_query, start_index=start_index, nb=nb, user_ids=user_ids)
+        # escape the LIKE wildcards, "_" is common in unique names
+        pattern = '%' + name_query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        similarity = func.greatest(
+            func.similarity(User.nickName, name_query),
+            func.similarity(User.uniqueName, name_query))
+        query = User.query_reduced_users(). \
+            filter(or_(User.nickName.ilike(pattern, escape='\\'), User.uniqueName.ilike(pattern, escape='\\')))
+        if user_ids is not None:
+            query = query.filter(User.id.in_(user_ids))
+        matched_users = query. \
+            order_by(desc(similarity), User.id). \
+            offset(start_index). \
+            limit(nb). \
+            all()
+        return [User.row_to_reduced_dict(row) for row in matched_users]
+
+    @classmethod
+    @read_from_replica
+    def build_search_index(cls):
+        """(Re)build USER_SEARCH_INDEX from every user, reading only the reduced columns."""
+        rows = cls.query_reduced_users().yield_per(1000)
+        USER_SEARCH_INDEX.build(cls.row_to_reduced_dict(row) for row in rows)
 
     @classmethod
     def update_nick_name(cls, user_id: str, new_nick_name: str) -> Dict:
@@ -232,6 +429,9 @@ class User(Base, UserMixin):
             user.nickName = new_nick_name
             reduced_dict = user.to_reduced_dict()
             db_session.commit()
+            cls.invalidate_reduced_user(user_id=user_id)
+            if USER_SEARCH_INDEX.accepts_updates:
+                USER_SEARCH_INDEX.add(reduced_dict)
             return reduced_dict
         else:
             return {}
@@ -252,8 +452,51 @@ class Followed(Base):
     """Sqlalchemy Followed model"""
     __tablename__ = 'followed'
 
+    # sort type of the followers -> copy of the follower's column, filled by a trigger of PostgreSQL
+    __follower_sort_keys = {SortType.CREATE_TIME.value: 'to_create_time'}
+
     query = db_session.query_property()
 
     from_id = Column(TEXT, ForeignKey('_user.id'), primary_key=True)
     to_id = Column(TEXT, ForeignKey('_user.id'), primary_key=True)
     follow_time = Column(TIMESTAMP, nullable=False)
+    to_create_time = Column(TIMESTAMP, nullable=False)
+
+    @classmethod
+    def get_sort_column(cls, sort_by: str):
+        if sort_by not in cls.__follower_sort_keys:
+            raise ValueError(f"Followers can't be sorted by {sort_by}")
+        return getattr(cls, cls.__follower_sort_keys[sort_by])
+
+
+class UserPrincipal(UserMixin):
+    """
+    Authenticated user of a request, known by the id of its verified token or session.
+
+    Most endpoints only need `current_user.id`, so the User row is only loaded when another attribute is accessed.
+    The existence of the user is only checked then: a deleted user stays authenticated until its session or token
+    expires, but can't load anything of its own.
+    """
+
+    def __init__(self, user_id: str):
+        self.id = user_id
+        self._user = None
+
+    @property
+    def user(self) -> User:
+        """:raise UserPrincipalNotFound when the user has been deleted"""
+        if self._user is None:
+            try:
+                self._user = User.get(self.id)
+            except UserNotFound:
+                raise UserPrincipalNotFound(f"User {self.id} no longer exists")
+        return self._user
+
+    def __getattr__(self, name: str):
+        # only called for the attributes the principal doesn't have
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __repr__(self):
+        return f"UserPrincipal({self.id})"
@@ -0,0 +1,65 @@
+"""
+Connection pool of PostgreSQL measuring how long requests wait for a connection.
+"""
+import threading
+import time
+from typing import Dict, Any
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_time = 0.
+        self.max_wait_time = 0.
+        self._lock = threading.Lock()
+
+    def record_checkout(self, wait_time: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "averageWaitMs": self.total_wait_time / attempts * 1000 if attempts else 0.,
+                "maxWaitMs": self.max_wait_time * 1000,
+            }
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool recording the time spent waiting for a connection at each checkout."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start_time = time.monotonic()
+        try:
+            connection = super()._do_get()
+        except TimeoutError:
+            self.metrics.record_checkout(time.monotonic() - start_time, timed_out=True)
+            raise
+        self.metrics.record_checkout(time.monotonic() - start_time)
+        return connection
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            **self.metrics.to_dict(),
+            "size": self.size(),
+            "checkedOut": self.checkedout(),
+            "checkedIn": self.checkedin(),
+            "overflow": self.overflow(),
+            "maxOverflow": self._max_overflow,
+        }
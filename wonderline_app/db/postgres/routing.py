@@ -0,0 +1,82 @@
+"""
+Routing of the PostgreSQL reads between the primary and an optional read replica.
+"""
+import logging
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ReplicaLagMonitor:
+    """
+    Tell whether the replica is close enough to the primary, checking its replication lag at most once per interval.
+
+    The lag is 0 when the replica has replayed all the WAL it received, and the time since the last transaction it
+    replayed otherwise: that time also grows while the primary is idle, when the replica is nevertheless up to date.
+    """
+    LAG_QUERY = text("SELECT pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn(), "
+                     "EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())")
+
+    def __init__(self, replica: Engine, max_lag: float, check_interval: float = 5.):
+        self.replica = replica
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag: Optional[float] = None  # None when the replica is unreachable
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def _get_lag(self) -> float:
+        with self.replica.connect() as connection:
+            has_replayed_everything, replay_delay = connection.execute(self.LAG_QUERY).first()
+        # both are NULL when the server isn't a replica, or hasn't replayed anything yet
+        if has_replayed_everything or replay_delay is None:
+            return 0.
+        return float(replay_delay)
+
+    def is_usable(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                try:
+                    self.lag = self._get_lag()
+                except Exception as e:
+                    LOGGER.warning(f"Failed to get the lag of the PostgreSQL replica, reading from the primary: {e}")
+                    self.lag = None
+            return self.lag is not None and self.lag <= self.max_lag
+
+
+class RoutingSession(Session):
+    """
+    Session reading from the replica within `read_from_replica` methods, and from the primary everywhere else.
+
+    Once the session has written anything, it sticks to the primary so that it reads its own writes.
+    """
+
+    def __init__(self, replica: Optional[Engine] = None, replica_monitor: Optional[ReplicaLagMonitor] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.replica = replica
+        self.replica_monitor = replica_monitor
+        self.replica_depth = 0
+        self.has_written = False
+
+    def get_bind(self, mapper=None, clause=None):
+        if self.replica_depth and not self.has_written:
+            return self.replica
+        return super().get_bind(mapper=mapper, clause=clause)
+
+    def can_use_replica(self) -> bool:
+        if self.replica is None or self.has_written or self.new or self.dirty or self.deleted:
+            return False
+        return self.replica_monitor is None or self.replica_monitor.is_usable()
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _stick_to_primary(session: RoutingSession, flush_context):
+    session.has_written = True
@@ -1,3 +1,10 @@
+import os
+
+
 class BaseConfig:
     """Base Flask config."""
     BUNDLE_ERRORS = True
+    # shared by every worker and node, so that sessions and user tokens are valid everywhere
+    SECRET_KEY = os.environ.get('SECRET_KEY')
+    # required by GET /metrics in the X-Metrics-Token header, the metrics API isn't registered when it's not set
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
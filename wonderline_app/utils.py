@@ -1,7 +1,10 @@
 import base64
+import binascii
 import datetime
+import json
 import uuid
 from enum import Enum, auto
+from typing import Dict, Iterable, List, Optional
 
 import reverse_geocoder
 import yaml
@@ -34,25 +37,74 @@ def set_logging(logging_config_file_path):
     logging.config.dictConfig(logging_config)
 
 
-def edit_distance(word1: str, word2: str) -> int:
-    l1, l2 = len(word1), len(word2)
-    dp = [[0] * (l2 + 1) for _ in range(l1 + 1)]
-    for i in range(l1 + 1):
-        dp[i][0] = i
-    for i in range(l2 + 1):
-        dp[0][i] = i
-    for i in range(1, l1 + 1):
-        for j in range(1, l2 + 1):
-            # insert on word1
-            insert = 1 + dp[i][j - 1]
-            # delete on word1
-            delete = 1 + dp[i - 1][j]
-            # replace on word1, word2
-            replace = 1 + dp[i - 1][j - 1]
-            if word1[i - 1] == word2[j - 1]:
-                replace -= 1
-            dp[i][j] = min(insert, delete, replace)
-    return dp[l1][l2]
+def _get_pattern_masks(pattern: str) -> Dict[str, int]:
+    """Map each character of the pattern to the bit mask of its positions."""
+    masks = {}
+    for i, char in enumerate(pattern):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    return masks
+
+
+def _bit_parallel_edit_distance(pattern_masks: Dict[str, int], pattern_length: int, text: str,
+                                max_distance: Optional[int]) -> int:
+    """
+    Myers' bit-parallel edit distance (in Hyyrö's formulation), one column of the DP matrix per character of text.
+
+    Python integers being unbounded, the whole column fits in one integer whatever the length of the pattern.
+    """
+    text_length = len(text)
+    if not pattern_length or not text_length:
+        distance = pattern_length + text_length
+        return distance if max_distance is None else min(distance, max_distance + 1)
+    all_ones = (1 << pattern_length) - 1
+    last_bit = 1 << (pattern_length - 1)
+    positive_vertical, negative_vertical = all_ones, 0
+    distance = pattern_length
+    for i, char in enumerate(text):
+        eq = pattern_masks.get(char, 0)
+        x_vertical = eq | negative_vertical
+        x_horizontal = (((eq & positive_vertical) + positive_vertical) ^ positive_vertical) | eq
+        positive_horizontal = negative_vertical | (~(x_horizontal | positive_vertical) & all_ones)
+        negative_horizontal = positive_vertical & x_horizontal
+        if positive_horizontal & last_bit:
+            distance += 1
+        elif negative_horizontal & last_bit:
+            distance -= 1
+        # the distance changes by at most 1 per remaining character of text
+        if max_distance is not None and distance - (text_length - i - 1) > max_distance:
+            return max_distance + 1
+        positive_horizontal = ((positive_horizontal << 1) | 1) & all_ones
+        negative_horizontal = (negative_horizontal << 1) & all_ones
+        positive_vertical = negative_horizontal | (~(x_vertical | positive_horizontal) & all_ones)
+        negative_vertical = positive_horizontal & x_vertical
+    return distance if max_distance is None else min(distance, max_distance + 1)
+
+
+def edit_distance(word1: str, word2: str, max_distance: Optional[int] = None) -> int:
+    """
+    Get the Levenshtein distance between two words.
+
+    When max_distance is given, the computation stops as soon as the distance is known to exceed it,
+    and max_distance + 1 is returned.
+    """
+    if max_distance is not None and abs(len(word1) - len(word2)) > max_distance:
+        return max_distance + 1
+    # the shorter word is the pattern, so that the bit vectors are as small as possible
+    pattern, text = (word1, word2) if len(word1) <= len(word2) else (word2, word1)
+    return _bit_parallel_edit_distance(_get_pattern_masks(pattern), len(pattern), text, max_distance)
+
+
+def edit_distances(query: str, candidates: Iterable[str], max_distance: Optional[int] = None) -> List[int]:
+    """Get the edit distances between the query and every candidate, see `edit_distance`."""
+    query_masks = _get_pattern_masks(query)
+    query_length = len(query)
+    distances = []
+    for candidate in candidates:
+        if max_distance is not None and abs(query_length - len(candidate)) > max_distance:
+            distances.append(max_distance + 1)
+        else:
+            distances.append(_bit_parallel_edit_distance(query_masks, query_length, candidate, max_distance))
+    return distances
 
 
 def get_utc_with_delta(delta: int):
@@ -87,6 +139,22 @@ def get_uuid() -> str:
     return str(uuid.uuid4())
 
 
+def encode_cursor(values: List) -> str:
+    """Encode the JSON serializable values locating the last returned item into an opaque cursor."""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> List:
+    """Decode a cursor built by encode_cursor, raise ValueError when it is malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError(f"Invalid cursor {cursor}")
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid cursor {cursor}")
+    return values
+
+
 def encode_image(file_path):
     with open(file_path, "rb") as image_file:
         encoded_string = base64.b64encode(image_file.read())